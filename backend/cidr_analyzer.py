@@ -2,19 +2,120 @@
 CIDR Analyzer for GCP Network Planner.
 Provides IP range conflict detection and utilization analysis.
 """
+import bisect
 import ipaddress
+from functools import lru_cache
 from typing import Optional
-from models import CIDRConflict, Subnet, NetworkTopology
+from models import CIDRConflict, Subnet, NetworkTopology, VPCNetwork
 
 
+@lru_cache(maxsize=8192)
 def parse_cidr(cidr: str) -> Optional[ipaddress.IPv4Network]:
-    """Parse a CIDR string into an IPv4Network object."""
+    """
+    Parse a CIDR string into an IPv4Network object.
+    Cached: the same subnet and request CIDRs are parsed again by every check, and networks are immutable.
+    """
     try:
         return ipaddress.IPv4Network(cidr, strict=False)
     except ValueError:
         return None
 
 
+class TopologyIndex:
+    """
+    Lookups built in one pass over a topology, so request handlers don't re-walk
+    projects -> VPCs -> subnets on every call. Built once per scan (see ScanManager.get_latest_index).
+    """
+    
+    def __init__(self, topology: NetworkTopology):
+        # project_id -> distinct primary and secondary CIDRs of the subnets in the project
+        self.cidrs_by_project: dict[str, set[str]] = {}
+        # (project_id, vpc_name) -> VPC
+        self.vpcs: dict[tuple[str, str], VPCNetwork] = {}
+        # Every primary and secondary range as (start, end, prefix_length, order, cidr, subnet_name,
+        # vpc_name, vpc_self_link, project_id, region), sorted by start address (see find_conflicts)
+        self.ranges: list[tuple] = []
+        
+        for project in topology.projects:
+            cidrs = self.cidrs_by_project.setdefault(project.project_id, set())
+            for vpc in project.vpc_networks:
+                self.vpcs.setdefault((project.project_id, vpc.name), vpc)
+                for subnet in vpc.subnets:
+                    cidrs.add(subnet.ip_cidr_range)
+                    self._add_range(subnet.ip_cidr_range, subnet.name, vpc, project.project_id, subnet.region)
+                    for secondary in subnet.secondary_ip_ranges:
+                        secondary_cidr = secondary.get("ip_cidr_range")
+                        if not secondary_cidr:
+                            continue
+                        cidrs.add(secondary_cidr)
+                        self._add_range(
+                            secondary_cidr, f"{subnet.name}:{secondary.get('range_name', 'secondary')}",
+                            vpc, project.project_id, subnet.region
+                        )
+        
+        self.ranges.sort(key=lambda r: r[0])
+        self._starts = [r[0] for r in self.ranges]
+        # (start, prefix_length) -> ranges for that exact network, to look up supernets of a CIDR
+        self._by_network: dict[tuple[int, int], list[tuple]] = {}
+        for r in self.ranges:
+            self._by_network.setdefault((r[0], r[2]), []).append(r)
+    
+    def _add_range(self, cidr: str, subnet_name: str, vpc: VPCNetwork, project_id: str, region: str):
+        network = parse_cidr(cidr)
+        if network is None:
+            return
+        self.ranges.append((
+            int(network.network_address), int(network.broadcast_address), network.prefixlen,
+            len(self.ranges), cidr, subnet_name, vpc.name, vpc.self_link, project_id, region
+        ))
+    
+    def find_conflicts(
+        self,
+        input_cidr: str,
+        vpc_self_link: Optional[str] = None,
+        project_id: Optional[str] = None
+    ) -> list[CIDRConflict]:
+        """
+        Same result as find_all_conflicts, using binary search instead of checking every range.
+        
+        CIDR blocks either nest or are disjoint, so the ranges overlapping the input are those
+        starting inside it (found by bisect) plus its supernets (at most one network per shorter prefix).
+        """
+        network = parse_cidr(input_cidr)
+        if network is None:
+            return []
+        start, end, prefix = int(network.network_address), int(network.broadcast_address), network.prefixlen
+        
+        matches = self.ranges[bisect.bisect_left(self._starts, start):bisect.bisect_right(self._starts, end)]
+        for length in range(prefix):
+            supernet_start = start & (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+            if supernet_start != start:
+                matches.extend(self._by_network.get((supernet_start, length), ()))
+        matches.sort(key=lambda r: r[3])
+        
+        conflicts = []
+        for _, _, length, _, cidr, subnet_name, vpc_name, self_link, pid, region in matches:
+            if project_id and pid != project_id:
+                continue
+            if vpc_self_link and self_link != vpc_self_link:
+                continue
+            if length == prefix:
+                overlap_type = "exact"
+            elif length > prefix:
+                overlap_type = "contains"
+            else:
+                overlap_type = "contained_by"
+            conflicts.append(CIDRConflict(
+                conflicting_cidr=cidr,
+                subnet_name=subnet_name,
+                vpc_name=vpc_name,
+                project_id=pid,
+                region=region,
+                overlap_type=overlap_type
+            ))
+        return conflicts
+
+
 def check_cidr_overlap(cidr1: str, cidr2: str) -> Optional[str]:
     """
     Check if two CIDRs overlap and return the overlap type.
@@ -120,28 +221,41 @@ def find_available_cidrs(
     Find available CIDR blocks given a list of existing CIDRs.
     """
     base_network = parse_cidr(base_cidr)
-    if base_network is None:
+    if base_network is None or not base_network.prefixlen <= prefix_length <= 32:
         return []
+    base_start, base_end = int(base_network.network_address), int(base_network.broadcast_address)
     
-    existing_networks = [parse_cidr(c) for c in existing_cidrs if parse_cidr(c)]
+    # Existing ranges inside the base as merged, sorted integer intervals
+    intervals = []
+    for cidr in existing_cidrs:
+        network = parse_cidr(cidr)
+        if network is not None:
+            start, end = int(network.network_address), int(network.broadcast_address)
+            if start <= base_end and end >= base_start:
+                intervals.append((max(start, base_start), min(end, base_end)))
+    intervals.sort()
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
     
-    # Generate candidate subnets
+    # Sweep the aligned candidates in address order, jumping past each taken interval
+    # instead of testing every candidate against every existing network
+    size = 1 << (32 - prefix_length)
     suggestions = []
-    try:
-        for candidate in base_network.subnets(new_prefix=prefix_length):
-            # Check if candidate conflicts with any existing
-            has_conflict = False
-            for existing in existing_networks:
-                if candidate.overlaps(existing):
-                    has_conflict = True
-                    break
-            
-            if not has_conflict:
-                suggestions.append(str(candidate))
-                if len(suggestions) >= count:
-                    break
-    except ValueError:
-        pass
+    candidate = base_start
+    for start, end in merged + [[base_end + 1, base_end + 1]]:
+        while candidate + size - 1 < start:
+            suggestions.append(f"{ipaddress.IPv4Address(candidate)}/{prefix_length}")
+            if len(suggestions) >= count:
+                return suggestions
+            candidate += size
+        if candidate <= end:
+            # Next aligned block after the interval
+            candidate = base_start + (end + 1 - base_start + size - 1) // size * size
     
     return suggestions
 
@@ -216,6 +330,20 @@ def calculate_ip_utilization(
     }
 
 
+def get_cidr_info(cidr: str) -> dict:
+    """
+    Get detailed information about a CIDR block.
+    
+    Args:
+        cidr: The CIDR range to describe (e.g. "10.0.0.0/24")
+        
+    Returns:
+        Dict with addressing details, or an error entry for invalid input
+    """
+    network = parse_cidr(cidr)
+    if network is None:
+        return {"error": "Invalid CIDR"}
+    
     return {
         "cidr": cidr,
         "network_address": str(network.network_address),
@@ -241,8 +369,6 @@ def get_ip_details(ip_address: str, topology: NetworkTopology) -> dict:
     Returns:
         Dict with status, used_by, subnet, vpc, project info
     """
-    from models import UsedInternalIP, Subnet, VPCNetwork, Project
-    
     ip = None
     try:
         ip = ipaddress.IPv4Address(ip_address)
@@ -6,9 +6,10 @@ import os
 import json
 import uuid
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from pydantic import BaseModel
 import logging
 
@@ -17,6 +18,8 @@ logger = logging.getLogger(__name__)
 # Credentials storage directory
 CREDENTIALS_DIR = Path(__file__).parent / "credentials"
 CREDENTIALS_META_FILE = CREDENTIALS_DIR / "credentials_meta.json"
+# Upper bound for an uploaded key file; a service account key is a few KB
+MAX_CREDENTIAL_BYTES = 64 * 1024
 
 
 class CredentialInfo(BaseModel):
@@ -34,6 +37,12 @@ class CredentialsManager:
     """Manages multiple GCP credential files."""
     
     def __init__(self):
+        # Metadata as last read / written, and the meta file's (inode, mtime_ns, size) at that point;
+        # the inode catches a file replaced (e.g. by an atomic rename) within the mtime granularity
+        self._meta_cache: Optional[List[CredentialInfo]] = None
+        self._meta_stamp: Optional[Tuple[int, int, int]] = None
+        # Serializes the read-modify-write of the meta file; handlers run on the threadpool
+        self._lock = threading.RLock()
         self._ensure_dir_exists()
         self._load_meta()
     
@@ -43,28 +52,52 @@ class CredentialsManager:
         if not CREDENTIALS_META_FILE.exists():
             self._save_meta([])
     
+    def _meta_file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = CREDENTIALS_META_FILE.stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
     def _load_meta(self) -> List[CredentialInfo]:
         """Load credentials metadata."""
         try:
+            stamp = self._meta_file_stamp()
             with open(CREDENTIALS_META_FILE, 'r') as f:
                 data = json.load(f)
-                return [CredentialInfo(**item) for item in data]
+                credentials = [CredentialInfo(**item) for item in data]
         except Exception as e:
             logger.warning(f"Failed to load credentials meta: {e}")
+            self._meta_cache = None
             return []
+        self._meta_cache = [c.model_copy() for c in credentials]
+        self._meta_stamp = stamp
+        return credentials
+    
+    def _cached_meta(self) -> List[CredentialInfo]:
+        """
+        Credentials metadata for read-only use, re-read only when the meta file changed
+        (written here or by another worker). Mutators use _load_meta for their own copies.
+        """
+        with self._lock:
+            if self._meta_cache is None or self._meta_file_stamp() != self._meta_stamp:
+                self._load_meta()
+            return self._meta_cache if self._meta_cache is not None else []
     
     def _save_meta(self, credentials: List[CredentialInfo]):
         """Save credentials metadata."""
         with open(CREDENTIALS_META_FILE, 'w') as f:
             json.dump([c.model_dump() for c in credentials], f, indent=2)
+        self._meta_cache = [c.model_copy() for c in credentials]
+        self._meta_stamp = self._meta_file_stamp()
     
     def list_credentials(self) -> List[CredentialInfo]:
         """List all stored credentials."""
-        return self._load_meta()
+        return list(self._cached_meta())
     
     def get_active_credential(self) -> Optional[CredentialInfo]:
         """Get the currently active credential."""
-        credentials = self._load_meta()
+        credentials = self._cached_meta()
         for cred in credentials:
             if cred.is_active:
                 return cred
@@ -119,23 +152,24 @@ class CredentialsManager:
             f.write(content)
         
         # Create metadata
-        credentials = self._load_meta()
-        
-        # If this is the first credential, make it active
-        is_first = len(credentials) == 0
-        
-        new_cred = CredentialInfo(
-            id=cred_id,
-            name=name,
-            filename=filename,
-            project_id=cred_data.get('project_id'),
-            client_email=cred_data.get('client_email'),
-            upload_date=datetime.now().isoformat(),
-            is_active=is_first
-        )
-        
-        credentials.append(new_cred)
-        self._save_meta(credentials)
+        with self._lock:
+            credentials = self._load_meta()
+            
+            # If this is the first credential, make it active
+            is_first = len(credentials) == 0
+            
+            new_cred = CredentialInfo(
+                id=cred_id,
+                name=name,
+                filename=filename,
+                project_id=cred_data.get('project_id'),
+                client_email=cred_data.get('client_email'),
+                upload_date=datetime.now().isoformat(),
+                is_active=is_first
+            )
+            
+            credentials.append(new_cred)
+            self._save_meta(credentials)
         
         logger.info(f"Added credential: {name} ({cred_id})")
         return new_cred
@@ -150,22 +184,23 @@ class CredentialsManager:
         Returns:
             Updated CredentialInfo
         """
-        credentials = self._load_meta()
-        target = None
-        
-        for cred in credentials:
-            if cred.id == cred_id:
-                cred.is_active = True
-                target = cred
-            else:
-                cred.is_active = False
-        
-        if target is None:
-            raise ValueError(f"Credential not found: {cred_id}")
-        
-        self._save_meta(credentials)
-        logger.info(f"Activated credential: {target.name} ({cred_id})")
-        return target
+        with self._lock:
+            credentials = self._load_meta()
+            target = None
+            
+            for cred in credentials:
+                if cred.id == cred_id:
+                    cred.is_active = True
+                    target = cred
+                else:
+                    cred.is_active = False
+            
+            if target is None:
+                raise ValueError(f"Credential not found: {cred_id}")
+            
+            self._save_meta(credentials)
+            logger.info(f"Activated credential: {target.name} ({cred_id})")
+            return target
     
     def delete_credential(self, cred_id: str) -> bool:
         """
@@ -177,31 +212,32 @@ class CredentialsManager:
         Returns:
             True if deleted successfully
         """
-        credentials = self._load_meta()
-        target = None
-        
-        for cred in credentials:
-            if cred.id == cred_id:
-                target = cred
-                break
-        
-        if target is None:
-            raise ValueError(f"Credential not found: {cred_id}")
-        
-        if target.is_active:
-            raise ValueError("Cannot delete the active credential. Activate another credential first.")
-        
-        # Delete the file
-        filepath = CREDENTIALS_DIR / target.filename
-        if filepath.exists():
-            filepath.unlink()
-        
-        # Update metadata
-        credentials = [c for c in credentials if c.id != cred_id]
-        self._save_meta(credentials)
-        
-        logger.info(f"Deleted credential: {target.name} ({cred_id})")
-        return True
+        with self._lock:
+            credentials = self._load_meta()
+            target = None
+            
+            for cred in credentials:
+                if cred.id == cred_id:
+                    target = cred
+                    break
+            
+            if target is None:
+                raise ValueError(f"Credential not found: {cred_id}")
+            
+            if target.is_active:
+                raise ValueError("Cannot delete the active credential. Activate another credential first.")
+            
+            # Delete the file
+            filepath = CREDENTIALS_DIR / target.filename
+            if filepath.exists():
+                filepath.unlink()
+            
+            # Update metadata
+            credentials = [c for c in credentials if c.id != cred_id]
+            self._save_meta(credentials)
+            
+            logger.info(f"Deleted credential: {target.name} ({cred_id})")
+            return True
     
     def update_credential_name(self, cred_id: str, new_name: str) -> CredentialInfo:
         """
@@ -214,20 +250,21 @@ class CredentialsManager:
         Returns:
             Updated CredentialInfo
         """
-        credentials = self._load_meta()
-        target = None
-        
-        for cred in credentials:
-            if cred.id == cred_id:
-                cred.name = new_name
-                target = cred
-                break
-        
-        if target is None:
-            raise ValueError(f"Credential not found: {cred_id}")
-        
-        self._save_meta(credentials)
-        return target
+        with self._lock:
+            credentials = self._load_meta()
+            target = None
+            
+            for cred in credentials:
+                if cred.id == cred_id:
+                    cred.name = new_name
+                    target = cred
+                    break
+            
+            if target is None:
+                raise ValueError(f"Credential not found: {cred_id}")
+            
+            self._save_meta(credentials)
+            return target
 
 
 # Global instance
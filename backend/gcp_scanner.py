@@ -1,20 +1,21 @@
 
+import asyncio
+import ipaddress
 import logging
 import uuid
 import time
-from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from google.cloud import compute_v1
 
 from models import (
-    Project, NetworkTopology, PublicIP, UsedInternalIP, 
-    FirewallRule, CloudArmorPolicy, BackendService,
+    Project, NetworkTopology,
     GKEPod, GKEDeployment, GKEService, GKEIngress,
     GKEConfigMap, GKESecret, GKEPVC, GKECluster
 )
-from scanners.base import BaseScanner
+from scanners.base import BaseScanner, SharedExecutor, default_credentials, default_max_workers
 from scanners.project_scanner import ProjectScanner
 from scanners.network_scanner import NetworkScanner
 from scanners.lb_scanner import LBScanner
@@ -26,22 +27,61 @@ from scanners.storage_scanner import StorageScanner
 
 logger = logging.getLogger(__name__)
 
+
+def _ip_key(address: str):
+    """Compact hashable key for an IP address (packed bytes), falling back to the string if unparsable."""
+    try:
+        return ipaddress.ip_address(address).packed
+    except ValueError:
+        return address
+
+
 class GCPScanner:
     """
     Main entry point for GCP Network Scanning.
     Orchestrates specialized scanners to build the full topology.
     """
     
-    def __init__(self, max_workers: int = 20):
-        self.max_workers = max_workers
-        self.project_scanner = ProjectScanner(max_workers)
-        self.network_scanner = NetworkScanner(max_workers)
-        self.lb_scanner = LBScanner(max_workers)
-        self.firewall_scanner = FirewallScanner(max_workers)
-        self.address_scanner = AddressScanner(max_workers)
-        self.instance_scanner = GCEInstanceScanner(max_workers)
-        self.gke_scanner = GKEConsistentScanner(max_workers)
-        self.storage_scanner = StorageScanner(max_workers)
+    # Per-project result keys that are merged into the topology-level lists
+    RESOURCE_KEYS = (
+        'public_ips', 'internal_ips', 'firewalls', 'policies', 'backend_services',
+        'instances', 'gke_clusters', 'storage_buckets', 'gke_pods', 'gke_deployments',
+        'gke_services', 'gke_ingress', 'gke_configmaps', 'gke_secrets', 'gke_pvcs'
+    )
+    
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or default_max_workers()
+        # Leaf work (per-project resource sections) runs on one shared pool for the scanner's lifetime.
+        # Project coordinators block on that work, so they get their own pool to keep it from starving.
+        self._executor = SharedExecutor(self.max_workers, thread_name_prefix="gcpscan")
+        self._project_executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gcpscan-project")
+        # RPC fan-out inside scanner methods (prefetch listings, LB details, machine types, ...) shares
+        # one bounded pool instead of starting threads per call. Sections block on it, never the reverse.
+        self._rpc_executor = SharedExecutor(self.max_workers, thread_name_prefix="gcpscan-rpc")
+        
+        # One credentials object for every client of every scanner, so the token is fetched once
+        credentials = default_credentials()
+        executor = self._rpc_executor
+        self.project_scanner = ProjectScanner(self.max_workers, credentials, executor)
+        self.network_scanner = NetworkScanner(self.max_workers, credentials, executor)
+        self.lb_scanner = LBScanner(self.max_workers, credentials, executor)
+        self.firewall_scanner = FirewallScanner(self.max_workers, credentials, executor)
+        self.address_scanner = AddressScanner(self.max_workers, credentials, executor)
+        self.instance_scanner = GCEInstanceScanner(self.max_workers, credentials, executor)
+        self.gke_scanner = GKEConsistentScanner(self.max_workers, credentials, executor)
+        self.storage_scanner = StorageScanner(self.max_workers, credentials, executor)
+
+    def close(self):
+        """Shut down the scanner's thread pools."""
+        self._project_executor.shutdown(wait=True)
+        self._executor.shutdown(wait=True)
+        self._rpc_executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'GCPScanner':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
         
     def scan_network_topology(
         self,
@@ -78,84 +118,120 @@ class GCPScanner:
         
         # 2. Scanning Phase (Parallel Projects)
         scanned_projects: List[Project] = []
-        all_public_ips: List[PublicIP] = []
-        all_internal_ips: List[UsedInternalIP] = []
-        all_firewalls: List[FirewallRule] = []
-        all_policies: List[CloudArmorPolicy] = []
-        all_backend_services: List[BackendService] = []
-        all_instances: List[Any] = []
-        all_gke_clusters: List[Any] = []
-        all_storage_buckets: List[Any] = []
-        all_gke_pods: List[Any] = []
-        all_gke_deployments: List[Any] = []
-        all_gke_services: List[Any] = []
-        all_gke_ingress: List[Any] = []
-        all_gke_configmaps: List[Any] = []
-        all_gke_secrets: List[Any] = []
-        all_gke_pvcs: List[Any] = []
+        resources: Dict[str, List[Any]] = {key: [] for key in self.RESOURCE_KEYS}
+        totals = {'projects': len(project_ids), 'vpcs': 0, 'subnets': 0, 'failed': 0}
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_pid = {
-                executor.submit(self._scan_single_project, pid, include_shared_vpc, scan_options): pid 
-                for pid in project_ids
-            }
+        for result in self._iter_scanned_projects(project_ids, include_shared_vpc, scan_options):
+            project = result['project']
+            scanned_projects.append(project)
+            
+            # Single branch on status: failed projects carry no resources to merge or count
+            if project.scan_status != "success":
+                totals['failed'] += 1
+                continue
             
-            for future in as_completed(future_to_pid):
-                pid = future_to_pid[future]
-                try:
-                    result = future.result()
-                    if result:
-                        scanned_projects.append(result['project'])
-                        all_public_ips.extend(result['public_ips'])
-                        all_internal_ips.extend(result['internal_ips'])
-                        all_firewalls.extend(result['firewalls'])
-                        all_policies.extend(result['policies'])
-                        all_backend_services.extend(result['backend_services'])
-                        all_instances.extend(result['instances'])
-                        all_gke_clusters.extend(result['gke_clusters'])
-                        all_storage_buckets.extend(result['storage_buckets'])
-                        all_gke_pods.extend(result['gke_pods'])
-                        all_gke_deployments.extend(result['gke_deployments'])
-                        all_gke_services.extend(result.get('gke_services', []))
-                        all_gke_ingress.extend(result.get('gke_ingress', []))
-                        all_gke_configmaps.extend(result.get('gke_configmaps', []))
-                        all_gke_secrets.extend(result.get('gke_secrets', []))
-                        all_gke_pvcs.extend(result.get('gke_pvcs', []))
-                except Exception as e:
-                    logger.error(f"Project {pid} scan failed unexpectedly: {e}")
+            for key in self.RESOURCE_KEYS:
+                resources[key].extend(result.get(key, []))
+            
+            # Streaming counters so totals don't need extra passes later
+            vpcs = project.vpc_networks
+            totals['vpcs'] += len(vpcs)
+            totals['subnets'] += sum(len(v.subnets) for v in vpcs)
                     
         # 3. Aggregation Phase
-        topology = NetworkTopology(
+        topology = self._build_topology(scan_id, source_type, source_id, scanned_projects, totals, resources)
+        
+        logger.info(f"Scan finished in {time.time() - start_time:.2f}s")
+        return topology
+
+    async def scan_network_topology_async(
+        self,
+        source_type: str,
+        source_id: str,
+        include_shared_vpc: bool = True,
+        scan_options: Dict[str, bool] = None
+    ) -> NetworkTopology:
+        """
+        Awaitable variant of scan_network_topology for use from an event loop.
+        google-cloud-compute only ships REST (sync) clients, so the scan still fans out on
+        the scanner's thread pools; this just keeps the caller's loop free while it runs.
+        """
+        return await asyncio.to_thread(
+            self.scan_network_topology, source_type, source_id, include_shared_vpc, scan_options
+        )
+
+    def _iter_scanned_projects(
+        self,
+        project_ids: List[str],
+        include_shared_vpc: bool,
+        scan_options: Dict[str, bool] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Scans all projects concurrently, yielding each result as soon as its project finishes
+        so the caller merges finished projects while the rest are still scanning.
+        A project whose task raises is reported as an error stub instead of being dropped.
+        """
+        future_to_pid = {
+            self._project_executor.submit(self._scan_single_project, pid, include_shared_vpc, scan_options): pid 
+            for pid in project_ids
+        }
+        
+        for future in as_completed(future_to_pid):
+            pid = future_to_pid[future]
+            error_message = "Project scan returned no result"
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Project {pid} scan failed unexpectedly: {e}")
+                result = None
+                error_message = str(e)
+            
+            if not result:
+                result = {
+                    'project': Project(
+                        project_id=pid, project_name=pid,
+                        project_number="", scan_status="error",
+                        error_message=error_message
+                    )
+                }
+            yield result
+
+    def _build_topology(
+        self,
+        scan_id: str,
+        source_type: str,
+        source_id: str,
+        projects: List[Project],
+        totals: Dict[str, int],
+        resources: Dict[str, List[Any]]
+    ) -> NetworkTopology:
+        """Assemble the final topology from scanned projects and pre-computed totals."""
+        return NetworkTopology(
             scan_id=scan_id,
-            scan_timestamp=datetime.utcnow(),
+            scan_timestamp=datetime.now(timezone.utc),
             source_type=source_type,
             source_id=source_id,
-            projects=scanned_projects,
-            total_projects=len(project_ids),
-            total_vpcs=sum(len(p.vpc_networks) for p in scanned_projects),
-            total_subnets=sum(
-                len(v.subnets) for p in scanned_projects for v in p.vpc_networks
-            ),
-            failed_projects=sum(1 for p in scanned_projects if p.scan_status != "success"),
-            public_ips=all_public_ips,
-            used_internal_ips=all_internal_ips,
-            firewall_rules=all_firewalls,
-            cloud_armor_policies=all_policies,
-            backend_services=all_backend_services,
-            instances=all_instances,
-            gke_clusters=all_gke_clusters,
-            storage_buckets=all_storage_buckets,
-            gke_pods=all_gke_pods,
-            gke_deployments=all_gke_deployments,
-            gke_services=all_gke_services,
-            gke_ingress=all_gke_ingress,
-            gke_configmaps=all_gke_configmaps,
-            gke_secrets=all_gke_secrets,
-            gke_pvcs=all_gke_pvcs
+            projects=projects,
+            total_projects=totals['projects'],
+            total_vpcs=totals['vpcs'],
+            total_subnets=totals['subnets'],
+            failed_projects=totals['failed'],
+            public_ips=resources['public_ips'],
+            used_internal_ips=resources['internal_ips'],
+            firewall_rules=resources['firewalls'],
+            cloud_armor_policies=resources['policies'],
+            backend_services=resources['backend_services'],
+            instances=resources['instances'],
+            gke_clusters=resources['gke_clusters'],
+            storage_buckets=resources['storage_buckets'],
+            gke_pods=resources['gke_pods'],
+            gke_deployments=resources['gke_deployments'],
+            gke_services=resources['gke_services'],
+            gke_ingress=resources['gke_ingress'],
+            gke_configmaps=resources['gke_configmaps'],
+            gke_secrets=resources['gke_secrets'],
+            gke_pvcs=resources['gke_pvcs']
         )
-        
-        logger.info(f"Scan finished in {time.time() - start_time:.2f}s")
-        return topology
 
     def _scan_single_project(self, project_id: str, include_shared_vpc: bool, scan_options: Dict[str, bool] = None) -> Dict[str, Any]:
         """
@@ -186,54 +262,56 @@ class GCPScanner:
 
         try:
             # OPTIMIZATION: Scan sub-resources in parallel within the project
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                # 1. Start all basic network scans
-                f_vpcs = executor.submit(self.network_scanner.scan_vpc_networks, project_id, include_shared_vpc)
-                
-                # Conditional Scans
-                f_firewalls = None
-                f_policies = None
-                if include_firewalls:
-                    f_firewalls = executor.submit(self.firewall_scanner.scan_firewalls, project_id)
-                    f_policies = executor.submit(self.firewall_scanner.scan_cloud_armor, project_id)
-                
-                f_instances = None
-                if include_instances:
-                    f_instances = executor.submit(self.instance_scanner.scan_instances, project_id)
-                
-                f_gke = None
-                if include_gke:
-                    f_gke = executor.submit(self.gke_scanner.scan_all, project_id)
-                
-                f_storage = None
-                if include_storage:
-                    f_storage = executor.submit(self.storage_scanner.scan_buckets, project_id)
-                
-                f_lb_context = executor.submit(self.lb_scanner.prefetch_resources, project_id)
+            executor = self._executor
+            # 1. Start all basic network scans
+            f_vpcs = executor.submit(self.network_scanner.scan_vpc_networks, project_id, include_shared_vpc)
+            
+            # Conditional Scans
+            f_firewalls = None
+            f_policies = None
+            if include_firewalls:
+                f_firewalls = executor.submit(self.firewall_scanner.scan_firewalls, project_id)
+                f_policies = executor.submit(self.firewall_scanner.scan_cloud_armor, project_id)
+            
+            f_instances = None
+            if include_instances:
+                f_instances = executor.submit(self.instance_scanner.scan_instances, project_id)
+            
+            f_gke = None
+            if include_gke:
+                f_gke = executor.submit(self.gke_scanner.scan_all, project_id)
+            
+            f_storage = None
+            if include_storage:
+                f_storage = executor.submit(self.storage_scanner.scan_buckets, project_id)
+            
+            f_lb_context = executor.submit(self.lb_scanner.prefetch_resources, project_id)
+            f_address_context = executor.submit(self.address_scanner.prefetch_addresses, project_id)
 
-                # Wait for core network results needed for IPs
-                vpcs = f_vpcs.result()
-                lb_context = f_lb_context.result()
+            # Wait for core network results needed for IPs
+            vpcs = f_vpcs.result()
+            lb_context = f_lb_context.result()
+            address_context = f_address_context.result()
 
-                # Build Subnet Map for IP resolution
-                subnet_map = {}
-                for vpc in vpcs:
-                    for subnet in vpc.subnets:
-                        subnet_map[subnet.self_link] = vpc.name
+            # Build Subnet Map for IP resolution
+            subnet_map = {}
+            for vpc in vpcs:
+                for subnet in vpc.subnets:
+                    subnet_map[subnet.self_link] = vpc.name
 
-                # Start Address Scans (depend on lb_context and subnet_map)
-                f_public_ips = executor.submit(self.address_scanner.scan_addresses, project_id, "EXTERNAL", self.lb_scanner, lb_context=lb_context)
-                f_internal_ips = executor.submit(self.address_scanner.scan_addresses, project_id, "INTERNAL", self.lb_scanner, subnet_map=subnet_map, lb_context=lb_context)
+            # Start Address Scans (depend on lb_context and subnet_map); both types share one listing
+            f_public_ips = executor.submit(self.address_scanner.scan_addresses, project_id, "EXTERNAL", self.lb_scanner, lb_context=lb_context, address_context=address_context)
+            f_internal_ips = executor.submit(self.address_scanner.scan_addresses, project_id, "INTERNAL", self.lb_scanner, subnet_map=subnet_map, lb_context=lb_context, address_context=address_context)
 
-                # Collect all remaining results (handle skipped scans)
-                firewalls = f_firewalls.result() if f_firewalls else []
-                policies = f_policies.result() if f_policies else []
-                instances = f_instances.result() if f_instances else []
-                gke_data = f_gke.result() if f_gke else {}
-                storage_buckets = f_storage.result() if f_storage else []
-                
-                public_ips = f_public_ips.result()
-                internal_ips = f_internal_ips.result()
+            # Collect all remaining results (handle skipped scans)
+            firewalls = f_firewalls.result() if f_firewalls else []
+            policies = f_policies.result() if f_policies else []
+            instances = f_instances.result() if f_instances else []
+            gke_data = f_gke.result() if f_gke else {}
+            storage_buckets = f_storage.result() if f_storage else []
+            
+            public_ips = f_public_ips.result()
+            internal_ips = f_internal_ips.result()
 
             # Result aggregation logic
             project_obj = Project(
@@ -257,12 +335,17 @@ class GCPScanner:
             # Backend Services resolution (remains sequential but fast)
             all_ips = public_ips + internal_ips
             service_to_ips_map = {}
+            # Dedupe on (service key, packed address) in a set instead of scanning each IP list
+            seen_service_ips = set()
             for ip in all_ips:
                 if ip.details and ip.details.routing_rules:
+                    ip_key = _ip_key(ip.ip_address)
                     for rule in ip.details.routing_rules:
                         key = f"{project_id}|{ip.region}|{rule.backend_service}"
-                        if key not in service_to_ips_map: service_to_ips_map[key] = []
-                        if ip.ip_address not in service_to_ips_map[key]: service_to_ips_map[key].append(ip.ip_address)
+                        if (key, ip_key) in seen_service_ips:
+                            continue
+                        seen_service_ips.add((key, ip_key))
+                        service_to_ips_map.setdefault(key, []).append(ip.ip_address)
             
             backend_services = self.lb_scanner.collect_backend_services(project_obj, service_to_ips_map, lb_context)
 
@@ -295,21 +378,27 @@ class GCPScanner:
             }
 
 
-        except Exception as e:
-            logger.error(f"Error scanning project {project_id}: {e}")
-            return {
-                'project': Project(
-                    project_id=project_id,
-                    project_name=details.get('display_name', project_id),
-                    project_number=details.get('project_number', ""),
-                    vpc_networks=[],
-                    is_shared_vpc_host=False,
-                    shared_vpc_host_project=None,
-                    scan_status="error",
-                    error_message=str(e)
-                ),
-                'public_ips': [], 'internal_ips': [], 'firewalls': [], 'policies': [], 'backend_services': []
-            }
-
+def init_scan_process(level: int, log_format: str):
+    """Initializer for scan worker processes, which start without the API's logging setup."""
+    logging.basicConfig(level=level, format=log_format)
 
 
+def scan_topology_json(
+    source_type: str,
+    source_id: str,
+    include_shared_vpc: bool = True,
+    scan_options: Dict[str, bool] = None
+) -> str:
+    """
+    Run a full scan and return the topology serialized to JSON.
+    Entry point for scan worker processes: the JSON string crosses the process boundary far more
+    cheaply than pickling the model.
+    """
+    with GCPScanner() as scanner:
+        topology = scanner.scan_network_topology(
+            source_type=source_type,
+            source_id=source_id,
+            include_shared_vpc=include_shared_vpc,
+            scan_options=scan_options
+        )
+    return topology.model_dump_json()
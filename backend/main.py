@@ -2,15 +2,42 @@
 GCP Network Planner API
 FastAPI application for scanning and analyzing GCP network topology.
 """
+import asyncio
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import Optional, List, Dict
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+from typing import Optional, List, Dict, Set, Tuple
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from credentials_manager import credentials_manager, CredentialInfo
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import aiodns
+    from aiodns.error import DNSError
+    AIODNS_AVAILABLE = True
+    DNS_ERRORS = (socket.gaierror, DNSError)
+except ImportError:
+    AIODNS_AVAILABLE = False
+    DNS_ERRORS = (socket.gaierror,)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from credentials_manager import credentials_manager, CredentialInfo, MAX_CREDENTIAL_BYTES
 
 from models import (
     ScanRequest, CIDRCheckRequest, CIDRCheckResponse,
@@ -20,31 +47,77 @@ from models import (
     SuffixSearchRequest, SuffixSearchResponse,
     GKEHPA
 )
-from gcp_scanner import GCPScanner
+from gcp_scanner import init_scan_process, scan_topology_json
 from cidr_analyzer import (
-    find_all_conflicts, suggest_available_cidrs, find_available_cidrs,
-    calculate_ip_utilization,
+    find_available_cidrs,
+    calculate_ip_utilization, get_cidr_info,
     get_ip_details, find_common_suffix_ips
 )
 from security_analyzer import analyze_security, SecurityReport
 
 # Configure logging
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    format=LOG_FORMAT
 )
 logger = logging.getLogger(__name__)
 
 from scan_manager import scan_manager
 
+# Scans run on their own bounded pool rather than as BackgroundTasks, so they don't occupy
+# the threadpool FastAPI uses for requests; scans beyond the limit wait as "pending".
+MAX_CONCURRENT_SCANS = int(os.getenv("MAX_CONCURRENT_SCANS", "2"))
+scan_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SCANS, thread_name_prefix="scan")
+
+
+def _new_scan_processes() -> ProcessPoolExecutor:
+    # Spawned rather than forked: this process already runs threads (scan pool, Redis listener)
+    return ProcessPoolExecutor(
+        max_workers=MAX_CONCURRENT_SCANS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_scan_process,
+        initargs=(logging.INFO, LOG_FORMAT)
+    )
+
+
+# The scanner itself (response parsing, CIDR math, model validation) runs in worker processes, so
+# concurrent scans don't contend with each other or with request handling for the GIL. Each
+# scan_executor thread just waits on its scan's process and saves the result.
+scan_processes = _new_scan_processes()
+# Guards replacing scan_processes after a worker dies, which any scan thread may do
+_scan_processes_lock = threading.Lock()
+
+# Longest a status request may be held open waiting for its scan to change (see get_scan_status)
+MAX_STATUS_WAIT = 30.0
+# scan_id -> one event per waiting status request, set the next time that scan changes
+_scan_waiters: Dict[str, Set[asyncio.Event]] = {}
+
+
+def _wake_scan_waiters(scan_id: str):
+    for event in _scan_waiters.pop(scan_id, ()):
+        event.set()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("Starting GCP Network Planner API")
-    scan_manager.load_scans()
+    # Off the event loop: reading scan files the index doesn't cover can take a while
+    await asyncio.to_thread(scan_manager.load_scans)
+    loop = asyncio.get_running_loop()
+
+    def on_scan_changed(scan_id: str):
+        # Called from scan threads and the Redis listener; waiters live on the event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(_wake_scan_waiters, scan_id)
+
+    scan_manager.add_listener(on_scan_changed)
     yield
     logger.info("Shutting down GCP Network Planner API")
+    scan_executor.shutdown(wait=False, cancel_futures=True)
+    scan_processes.shutdown(wait=False, cancel_futures=True)
+    scan_manager.close()
 
 
 app = FastAPI(
@@ -59,38 +132,49 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173", "http://localhost:3002"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists (what the frontend sends) rather than wildcards
+    allow_methods=["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
+    allow_headers=["Accept", "Authorization", "Content-Type", "If-None-Match"],
+    # Lets the frontend read the status ETag to send back in If-None-Match (see get_scan_status)
+    expose_headers=["ETag"],
 )
 
+# Topology payloads are large and repetitive (CIDRs, project and VPC names), so they compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 
 def run_scan_task(scan_id: str, source_type: str, source_id: str, include_shared_vpc: bool, scan_options: Optional[Dict[str, bool]] = None):
     """Background task for running network scan."""
+    global scan_processes
     try:
         # Update running status
         current_data = scan_manager.get_scan(scan_id)
         if current_data:
-            current_data["status"] = "running"
-            scan_manager.save_scan(scan_id, current_data)
+            scan_manager.save_scan(scan_id, {**current_data, "status": "running"})
         
-        scanner = GCPScanner()
-        topology = scanner.scan_network_topology(
-            source_type=source_type,
-            source_id=source_id,
-            include_shared_vpc=include_shared_vpc,
-            scan_options=scan_options
-        )
+        pool = scan_processes
+        try:
+            payload = pool.submit(
+                scan_topology_json, source_type, source_id, include_shared_vpc, scan_options
+            ).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); later scans get a fresh pool
+            with _scan_processes_lock:
+                if scan_processes is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    scan_processes = _new_scan_processes()
+            raise
+        topology = NetworkTopology.model_validate_json(payload)
         
         # Prepare result
         result = {
             "status": "completed",
-            "topology": topology.model_dump(),
             "progress": 1.0,
             "projects_scanned": topology.total_projects,
             "total_projects": topology.total_projects,
             "scan_id": scan_id
         }
-        scan_manager.save_scan(scan_id, result)
+        scan_manager.save_scan(scan_id, result, topology=topology)
         
         logger.info(f"Scan {scan_id} completed: {topology.total_projects} projects, {topology.total_vpcs} VPCs")
         
@@ -107,41 +191,67 @@ def run_scan_task(scan_id: str, source_type: str, source_id: str, include_shared
 @app.get("/api/scan/{scan_id}/summary")
 async def get_scan_summary(scan_id: str):
     """Get a light summary of scan results to avoid loading giant JSONs."""
-    scan_data = scan_manager.get_scan(scan_id)
-    if not scan_data:
+    # Counts are taken when the scan is saved / loaded (see summarize_topology), so the full scan isn't read here
+    metadata = scan_manager.get_scan_metadata(scan_id)
+    if not metadata:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    topo = scan_data.get("topology", {})
     return {
         "scan_id": scan_id,
-        "status": scan_data.get("status"),
-        "timestamp": topo.get("scan_timestamp"),
-        "summary": {
-            "projects": len(topo.get("projects", [])),
-            "vpcs": topo.get("total_vpcs", 0),
-            "subnets": topo.get("total_subnets", 0),
-            "public_ips": len(topo.get("public_ips", [])),
-            "internal_ips": len(topo.get("used_internal_ips", [])),
-            "instances": len(topo.get("instances", [])),
-            "gke_clusters": len(topo.get("gke_clusters", [])),
-            "gke_pods": len(topo.get("gke_pods", [])),
-            "gke_deployments": len(topo.get("gke_deployments", [])),
-            "gke_services": len(topo.get("gke_services", [])),
-            "storage_buckets": len(topo.get("storage_buckets", [])),
-            "firewall_rules": len(topo.get("firewall_rules", [])),
-        }
+        "status": metadata.get("status"),
+        "timestamp": metadata.get("timestamp"),
+        "summary": metadata.get("summary"),
     }
 
 
+def _json_bytes(content) -> bytes:
+    """
+    Encode data that is already JSON-safe (the plain dicts / lists of a saved scan),
+    skipping the jsonable_encoder pass FastAPI applies to returned values.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _latest_resources(request: Request, name: str, collect) -> Response:
+    """
+    A resource list from the latest scan: `collect(topology_dict)` runs and is encoded once per
+    scan, later requests get the cached bytes (see ScanManager.get_latest_view).
+    Called from plain `def` endpoints: a cold cache loads the topology from disk / Redis,
+    which must not happen on the event loop.
+    Clients sending `Accept: application/x-ndjson` get one JSON object per line, streamed.
+    """
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        items = scan_manager.get_latest_view(f"{name}.items", collect) or []
+        return StreamingResponse((_json_bytes(item) + b"\n" for item in items), media_type="application/x-ndjson")
+    body = scan_manager.get_latest_view(name, lambda topo: _json_bytes(collect(topo)))
+    return Response(content=body if body is not None else b"[]", media_type="application/json")
+
+
+_scan_history_adapter = TypeAdapter(List[ScanHistoryItem])
+
+
+def _new_scan_id() -> str:
+    """
+    A UUIDv7 (RFC 9562): 48-bit millisecond timestamp followed by random bits, so scan IDs
+    (and the scan files named after them) sort by creation time.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    # Version 7 and the RFC variant
+    value = value & ~(0xF << 76) | (0x7 << 76)
+    value = value & ~(0x3 << 62) | (0x2 << 62)
+    return str(uuid.UUID(int=value))
+
+
 @app.post("/api/scan", response_model=ScanStatusResponse)
-async def start_scan(request: ScanRequest, background_tasks: BackgroundTasks):
+async def start_scan(request: ScanRequest):
     """
     Start a network topology scan.
     
     Returns a scan ID that can be used to check status and retrieve results.
     """
-    import uuid
-    scan_id = str(uuid.uuid4())
+    scan_id = _new_scan_id()
     
     # Initialize scan status
     scan_data = {
@@ -154,7 +264,7 @@ async def start_scan(request: ScanRequest, background_tasks: BackgroundTasks):
     scan_manager.save_scan(scan_id, scan_data)
     
     # Start background scan
-    background_tasks.add_task(
+    scan_executor.submit(
         run_scan_task,
         scan_id,
         request.source_type,
@@ -176,89 +286,120 @@ async def start_scan(request: ScanRequest, background_tasks: BackgroundTasks):
 
 
 @app.get("/api/scan/{scan_id}/status", response_model=ScanStatusResponse)
-async def get_scan_status(scan_id: str):
-    """Get the status of a running or completed scan."""
-    scan_data = scan_manager.get_scan(scan_id)
-    if not scan_data:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
-    return ScanStatusResponse(
-        scan_id=scan_id,
-        status=scan_data.get("status", "unknown"),
-        progress=scan_data.get("progress", 0),
-        projects_scanned=scan_data.get("projects_scanned", 0),
-        total_projects=scan_data.get("total_projects", 0),
-        message=scan_data.get("error")
+async def get_scan_status(scan_id: str, request: Request, wait: float = 0):
+    """
+    Get the status of a running or completed scan.
+    With `wait` (seconds, at most MAX_STATUS_WAIT) and an If-None-Match of the current ETag, the
+    request is held until the status changes instead of answering 304 straight away.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(wait, 0.0), MAX_STATUS_WAIT)
+    changed: Optional[asyncio.Event] = None
+    try:
+        while True:
+            # The in-memory metadata carries the status fields; the full record is never read here
+            metadata = scan_manager.get_scan_metadata(scan_id)
+            if not metadata:
+                raise HTTPException(status_code=404, detail="Scan not found")
+
+            status = metadata.get("status") or "unknown"
+            progress = metadata.get("progress", 0)
+            projects_scanned = metadata.get("projects_scanned", 0)
+            total_projects = metadata.get("total_projects", 0)
+            message = metadata.get("error")
+
+            # Polls mostly see an unchanged status; answer those without re-encoding
+            fingerprint = f"{status}|{progress}|{projects_scanned}|{total_projects}|{message}"
+            etag = '"' + hashlib.blake2b(fingerprint.encode(), digest_size=8).hexdigest() + '"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if request.headers.get("if-none-match") != etag:
+                break
+            remaining = deadline - loop.time()
+            if wait <= 0 or remaining <= 0:
+                return Response(status_code=304, headers=headers)
+            if changed is None or changed.is_set():
+                # Register, then read the scan again, so a change in between isn't missed
+                changed = asyncio.Event()
+                _scan_waiters.setdefault(scan_id, set()).add(changed)
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if changed is not None:
+            waiters = _scan_waiters.get(scan_id)
+            if waiters is not None:
+                waiters.discard(changed)
+                if not waiters:
+                    del _scan_waiters[scan_id]
+
+    return Response(
+        content=ScanStatusResponse(
+            scan_id=scan_id,
+            status=status,
+            progress=progress,
+            projects_scanned=projects_scanned,
+            total_projects=total_projects,
+            message=message
+        ).model_dump_json(),
+        media_type="application/json",
+        headers=headers,
     )
 
 
 @app.get("/api/scan/{scan_id}/results", response_model=NetworkTopology)
-async def get_scan_results(scan_id: str):
+def get_scan_results(scan_id: str):
     """Get the results of a completed scan."""
-    scan_data = scan_manager.get_scan(scan_id)
-    if not scan_data:
+    metadata = scan_manager.get_scan_metadata(scan_id)
+    if not metadata:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    if scan_data.get("status") != "completed":
+    if metadata.get("status") != "completed":
         raise HTTPException(
             status_code=400, 
-            detail=f"Scan not completed. Current status: {scan_data.get('status')}"
+            detail=f"Scan not completed. Current status: {metadata.get('status')}"
         )
     
-    return NetworkTopology(**scan_data["topology"])
+    # Pre-serialized bytes, skipping response_model validation and re-encoding on every request
+    payload = scan_manager.get_topology_json(scan_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Scan results not available")
+    return Response(content=payload, media_type="application/json")
 
 
 @app.get("/api/scans", response_model=List[ScanHistoryItem])
 async def list_scans():
     """List all available scans using metadata (memory efficient)."""
-    history = []
-    metadata = scan_manager.get_all_scans_metadata()
-    for scan_id, data in metadata.items():
-        history.append(ScanHistoryItem(
-            scan_id=scan_id,
-            timestamp=data.get("timestamp") or datetime.utcnow(),
-            status=data.get("status", "unknown"),
-            source_type=data.get("source_type", "unknown"),
-            source_id=data.get("source_id", "unknown"),
-            total_projects=data.get("total_projects", 0),
-            total_vpcs=0, # Summary doesn't have these, frontend handles gracefully
-            total_subnets=0
-        ))
-            
-    # Sort by timestamp desc
-    return sorted(history, key=lambda x: str(x.timestamp), reverse=True)
+    return Response(content=_scan_history_adapter.dump_json(scan_manager.get_scan_history()), media_type="application/json")
 
 
 @app.get("/api/networks", response_model=Optional[NetworkTopology])
-async def get_latest_topology():
+def get_latest_topology():
     """Get the most recent scan results efficiently."""
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
-        return None
-    return NetworkTopology(**latest["topology"])
+    scan_id = scan_manager.latest_completed_scan_id
+    payload = scan_manager.get_topology_json(scan_id) if scan_id else None
+    return Response(content=payload or b"null", media_type="application/json")
 
 
 @app.post("/api/check-cidr", response_model=CIDRCheckResponse)
-async def check_cidr_conflict(request: CIDRCheckRequest):
+def check_cidr_conflict(request: CIDRCheckRequest):
     """
     Check if a CIDR conflicts with existing subnets.
     
     Uses the latest scan results to find conflicts.
     """
-    # Get the latest topology
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    # Get the latest topology's subnet index
+    index = scan_manager.get_latest_index()
+    if index is None:
         raise HTTPException(
             status_code=400, 
             detail="No scan results available. Run a scan first."
         )
     
-    topology = NetworkTopology(**latest["topology"])
-    
     # Find conflicts
-    conflicts = find_all_conflicts(
+    conflicts = index.find_conflicts(
         input_cidr=request.cidr,
-        topology=topology,
         vpc_self_link=request.vpc_self_link,
         project_id=request.project_id
     )
@@ -266,9 +407,9 @@ async def check_cidr_conflict(request: CIDRCheckRequest):
     # Suggest alternatives if conflicts found
     suggested_cidrs = []
     if conflicts:
-        suggested_cidrs = suggest_available_cidrs(
+        suggested_cidrs = find_available_cidrs(
             base_cidr="10.0.0.0/8",  # Default to RFC1918 space
-            topology=topology,
+            existing_cidrs=list({cidr for cidrs in index.cidrs_by_project.values() for cidr in cidrs}),
             prefix_length=24,
             count=5
         )
@@ -282,7 +423,7 @@ async def check_cidr_conflict(request: CIDRCheckRequest):
 
 
 @app.post("/api/plan-ip", response_model=IPPlanResponse)
-async def plan_ip(request: IPPlanRequest):
+def plan_ip(request: IPPlanRequest):
     """
     Plan IP range for a new subnet.
     
@@ -290,41 +431,29 @@ async def plan_ip(request: IPPlanRequest):
     1. Subnets in the source project
     2. Subnets in specified peer projects
     """
-    # Get the latest topology
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    # Get the latest topology's subnet index
+    index = scan_manager.get_latest_index()
+    if index is None:
         raise HTTPException(
             status_code=400, 
             detail="No scan results available. Run a scan first."
         )
     
-    topology = NetworkTopology(**latest["topology"])
-    
     # Collect conflict scopes
     projects_to_check = {request.source_project_id}
     if request.peer_projects:
         projects_to_check.update(request.peer_projects)
     
-    existing_cidrs = []
-    
-    # Iterate through topology to gather relevant subnets
-    for project in topology.projects:
-        if project.project_id in projects_to_check:
-            for vpc in project.vpc_networks:
-                # If specific VPC is requested for source, we might filter?
-                # But for safety, checking ALL subnets in the project is better 
-                # to avoid future conflicts if peered within same project.
-                # Logic: Gather ALL subnets from ALL checked projects.
-                
-                for subnet in vpc.subnets:
-                    existing_cidrs.append(subnet.ip_cidr_range)
-                    for secondary in subnet.secondary_ip_ranges:
-                        existing_cidrs.append(secondary.get("ip_cidr_range", ""))
+    # Gather ALL subnets (primary and secondary ranges) from ALL checked projects:
+    # checking every VPC in a project avoids future conflicts if peered within the same project.
+    existing_cidrs: set[str] = set()
+    for pid in projects_to_check:
+        existing_cidrs.update(index.cidrs_by_project.get(pid, ()))
     
     # Find available CIDRs
     available = find_available_cidrs(
         base_cidr=request.base_cidr,
-        existing_cidrs=existing_cidrs,
+        existing_cidrs=list(existing_cidrs),
         prefix_length=request.cidr_mask,
         count=10
     )
@@ -336,38 +465,34 @@ async def plan_ip(request: IPPlanRequest):
 
 
 @app.post("/api/check-ip", response_model=IPCheckResponse)
-async def check_ip_details(request: IPCheckRequest):
+def check_ip_details(request: IPCheckRequest):
     """
     Check detailed information about an internal IP.
     """
     # Get the latest topology
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    topology = scan_manager.get_latest_topology()
+    if topology is None:
         raise HTTPException(
             status_code=400, 
             detail="No scan results available. Run a scan first."
         )
     
-    topology = NetworkTopology(**latest["topology"])
-    
     return get_ip_details(request.ip_address, topology)
 
 
 @app.post("/api/find-suffix-ips", response_model=SuffixSearchResponse)
-async def find_suffix_ips(request: SuffixSearchRequest):
+def find_suffix_ips(request: SuffixSearchRequest):
     """
     Find available IPs with a specific suffix.
     """
     # Get the latest topology
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    topology = scan_manager.get_latest_topology()
+    if topology is None:
         raise HTTPException(
             status_code=400, 
             detail="No scan results available. Run a scan first."
         )
     
-    topology = NetworkTopology(**latest["topology"])
-    
     ips = find_common_suffix_ips(
         suffix=request.suffix,
         topology=topology,
@@ -399,22 +524,17 @@ class UtilizationRequest(BaseModel):
 
 
 @app.post("/api/utilization")
-async def get_vpc_utilization(request: UtilizationRequest):
+def get_vpc_utilization(request: UtilizationRequest):
     """Get IP utilization stats for a VPC."""
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    index = scan_manager.get_latest_index()
+    if index is None:
         raise HTTPException(status_code=400, detail="No scan results available")
     
-    topology = NetworkTopology(**latest["topology"])
-    
     # Find the VPC
-    for project in topology.projects:
-        if project.project_id == request.project_id:
-            for vpc in project.vpc_networks:
-                if vpc.name == request.vpc_name:
-                    return calculate_ip_utilization(request.vpc_cidr, vpc.subnets)
-    
-    raise HTTPException(status_code=404, detail="VPC not found")
+    vpc = index.vpcs.get((request.project_id, request.vpc_name))
+    if vpc is None:
+        raise HTTPException(status_code=404, detail="VPC not found")
+    return calculate_ip_utilization(request.vpc_cidr, vpc.subnets)
 
 
 class DomainResolveRequest(BaseModel):
@@ -427,18 +547,58 @@ class DomainResolveResponse(BaseModel):
     error: Optional[str] = None
 
 
+# Successful resolutions, domain -> (monotonic time resolved, ips); failures are not cached
+DNS_CACHE_TTL_SECONDS = 60
+_dns_cache: Dict[str, Tuple[float, List[str]]] = {}
+# c-ares resolver running on the event loop, created on first use (see _lookup_ips)
+_dns_resolver = None
+
+
+async def _lookup_ips(domain: str) -> List[str]:
+    """
+    IPv4 and IPv6 addresses of a domain, deduplicated and sorted.
+    Uses aiodns when installed, so lookups don't hold a thread each; otherwise getaddrinfo in a thread.
+    """
+    global _dns_resolver
+    if AIODNS_AVAILABLE:
+        if _dns_resolver is None:
+            _dns_resolver = aiodns.DNSResolver()
+        results = await asyncio.gather(
+            _dns_resolver.gethostbyname(domain, socket.AF_INET),
+            _dns_resolver.gethostbyname(domain, socket.AF_INET6),
+            return_exceptions=True
+        )
+        ips = {ip for result in results if not isinstance(result, BaseException) for ip in result.addresses}
+        if not ips:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return sorted(ips)
+    
+    # port 80 is just dummy to satisfy the call (AF_UNSPEC for both IPv4 and IPv6)
+    info = await asyncio.get_running_loop().getaddrinfo(domain, 80, proto=socket.IPPROTO_TCP)
+    # Extract IPs (item[4] is the address tuple, item[4][0] is the IP)
+    return sorted(set(item[4][0] for item in info))
+
+
 @app.post("/api/resolve-domain", response_model=DomainResolveResponse)
 async def resolve_domain(request: DomainResolveRequest):
     """Resolve domain name to IP addresses."""
-    import socket
+    key = request.domain.strip().lower()
+    now = time.monotonic()
+    cached = _dns_cache.get(key)
+    if cached and now - cached[0] < DNS_CACHE_TTL_SECONDS:
+        return DomainResolveResponse(domain=request.domain, ips=cached[1])
+    
     try:
-        # Use getaddrinfo to get IP addresses (AF_UNSPEC for both IPv4 and IPv6)
-        # port 80 is just dummy to satisfy the call
-        info = socket.getaddrinfo(request.domain, 80, proto=socket.IPPROTO_TCP)
-        # Extract IPs (item[4] is the address tuple, item[4][0] is the IP)
-        ips = sorted(list(set(item[4][0] for item in info)))
+        ips = await _lookup_ips(key)
+        
+        # Lazy sweep of expired entries on insert keeps the cache bounded by recent lookups
+        for expired in [d for d, (resolved_at, _) in _dns_cache.items() if now - resolved_at >= DNS_CACHE_TTL_SECONDS]:
+            del _dns_cache[expired]
+        _dns_cache[key] = (now, ips)
         return DomainResolveResponse(domain=request.domain, ips=ips)
-    except socket.gaierror as e:
+    except DNS_ERRORS as e:
         return DomainResolveResponse(domain=request.domain, ips=[], error=f"Resolution failed: {e}")
     except Exception as e:
         logger.error(f"Domain resolution error: {e}")
@@ -446,185 +606,154 @@ async def resolve_domain(request: DomainResolveRequest):
 
 
 @app.get("/api/audit/latest", response_model=SecurityReport)
-async def get_security_audit():
+def get_security_audit():
     """Get security audit report for the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if latest is None:
+    topology = scan_manager.get_latest_topology()
+    if topology is None:
         raise HTTPException(status_code=404, detail="No scan results available")
-    
-    topology = NetworkTopology(**latest["topology"])
-    return analyze_security(topology)
+    return Response(content=analyze_security(topology).model_dump_json(), media_type="application/json")
 
 
 # ============ Granular Resource List Endpoints ============
 
-@app.get("/api/resources/instances")
-async def list_instances():
-    """List all GCE instances from the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest:
-        return []
-    
-    topo = latest.get("topology", {})
-    all_instances = []
+def _with_project_name(topo: dict, key: str) -> list:
+    """Shallow copies of each project's resources, stamped with the project name.
+
+    The topology belongs to the scan cache, so the items are copied rather
+    than annotated in place.
+    """
+    return [
+        {**item, "project_name": project.get("project_name")}
+        for project in topo.get("projects", [])
+        for item in project.get(key, [])
+    ]
+
+
+def _collect_instances(topo: dict) -> list:
     # Collect from projects
-    for project in topo.get("projects", []):
-        for inst in project.get("instances", []):
-            inst["project_name"] = project.get("project_name")
-            all_instances.append(inst)
+    all_instances = _with_project_name(topo, "instances")
             
     # Also collect from top-level list if present
     if "instances" in topo:
         # Avoid duplicates if they are already in project lists
-        seen = {inst["name"] + inst["project_id"] for inst in all_instances}
+        seen = {(inst["name"], inst["project_id"]) for inst in all_instances}
         for inst in topo["instances"]:
-            if inst["name"] + inst["project_id"] not in seen:
+            if (inst["name"], inst["project_id"]) not in seen:
                 all_instances.append(inst)
                 
     return all_instances
 
 
-@app.get("/api/resources/gke-clusters")
-async def list_gke_clusters():
-    """List all GKE clusters from the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest:
-        return []
-    
-    topo = latest.get("topology", {})
-    all_clusters = []
-    for project in topo.get("projects", []):
-        for cluster in project.get("gke_clusters", []):
-            cluster["project_name"] = project.get("project_name")
-            all_clusters.append(cluster)
+def _collect_gke_clusters(topo: dict) -> list:
+    all_clusters = _with_project_name(topo, "gke_clusters")
     
     if "gke_clusters" in topo:
-        seen = {c["name"] + c["project_id"] for c in all_clusters}
+        seen = {(c["name"], c["project_id"]) for c in all_clusters}
         for cluster in topo["gke_clusters"]:
-            if cluster["name"] + cluster["project_id"] not in seen:
+            if (cluster["name"], cluster["project_id"]) not in seen:
                 all_clusters.append(cluster)
                 
     return all_clusters
 
 
-@app.get("/api/resources/storage-buckets")
-async def list_storage_buckets():
-    """List all Storage buckets from the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest:
-        return []
-    
-    topo = latest.get("topology", {})
-    all_buckets = []
-    for project in topo.get("projects", []):
-        for bucket in project.get("storage_buckets", []):
-            bucket["project_name"] = project.get("project_name")
-            all_buckets.append(bucket)
+def _collect_storage_buckets(topo: dict) -> list:
+    all_buckets = _with_project_name(topo, "storage_buckets")
             
     if "storage_buckets" in topo:
-        seen = {b["name"] + b["project_id"] for b in all_buckets}
+        seen = {(b["name"], b["project_id"]) for b in all_buckets}
         for bucket in topo["storage_buckets"]:
-            if bucket["name"] + bucket["project_id"] not in seen:
+            if (bucket["name"], bucket["project_id"]) not in seen:
                 all_buckets.append(bucket)
                 
     return all_buckets
 
 
+def _collect_vpcs(topo: dict) -> list:
+    return [
+        {**vpc, "project_id": project.get("project_id"), "project_name": project.get("project_name")}
+        for project in topo.get("projects", [])
+        for vpc in project.get("vpc_networks", [])
+    ]
+
+
+def _topology_list(key: str):
+    """Collector for a list kept at the top level of the topology."""
+    return lambda topo: topo.get(key, [])
+
+
+@app.get("/api/resources/instances")
+def list_instances(request: Request):
+    """List all GCE instances from the latest scan."""
+    return _latest_resources(request, "instances", _collect_instances)
+
+
+@app.get("/api/resources/gke-clusters")
+def list_gke_clusters(request: Request):
+    """List all GKE clusters from the latest scan."""
+    return _latest_resources(request, "gke_clusters", _collect_gke_clusters)
+
+
+@app.get("/api/resources/storage-buckets")
+def list_storage_buckets(request: Request):
+    """List all Storage buckets from the latest scan."""
+    return _latest_resources(request, "storage_buckets", _collect_storage_buckets)
+
+
 @app.get("/api/resources/vpcs")
-async def list_vpcs():
+def list_vpcs(request: Request):
     """List all VPC networks from the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest:
-        return []
-    
-    topo = latest.get("topology", {})
-    all_vpcs = []
-    for project in topo.get("projects", []):
-        for vpc in project.get("vpc_networks", []):
-            vpc["project_id"] = project.get("project_id")
-            vpc["project_name"] = project.get("project_name")
-            all_vpcs.append(vpc)
-    return all_vpcs
+    return _latest_resources(request, "vpcs", _collect_vpcs)
 
 @app.get("/api/resources/gke-pods")
-async def list_gke_pods():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_pods", [])
+def list_gke_pods(request: Request):
+    return _latest_resources(request, "gke_pods", _topology_list("gke_pods"))
 
 @app.get("/api/resources/gke-deployments")
-async def list_gke_deployments():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_deployments", [])
+def list_gke_deployments(request: Request):
+    return _latest_resources(request, "gke_deployments", _topology_list("gke_deployments"))
 
 @app.get("/api/resources/gke-services")
-async def list_gke_services():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_services", [])
+def list_gke_services(request: Request):
+    return _latest_resources(request, "gke_services", _topology_list("gke_services"))
 
 @app.get("/api/resources/gke-ingress")
-async def list_gke_ingress():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_ingress", [])
+def list_gke_ingress(request: Request):
+    return _latest_resources(request, "gke_ingress", _topology_list("gke_ingress"))
 
 @app.get("/api/resources/gke-configmaps")
-async def list_gke_configmaps():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_configmaps", [])
+def list_gke_configmaps(request: Request):
+    return _latest_resources(request, "gke_configmaps", _topology_list("gke_configmaps"))
 
 @app.get("/api/resources/gke-secrets")
-async def list_gke_secrets():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_secrets", [])
+def list_gke_secrets(request: Request):
+    return _latest_resources(request, "gke_secrets", _topology_list("gke_secrets"))
 
 @app.get("/api/resources/gke-pvcs")
-async def list_gke_pvcs():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_pvcs", [])
+def list_gke_pvcs(request: Request):
+    return _latest_resources(request, "gke_pvcs", _topology_list("gke_pvcs"))
 
 
 @app.get("/api/resources/gke-hpa")
-async def list_gke_hpa():
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest: return []
-    topo = latest.get("topology", {})
-    return topo.get("gke_hpas", [])
+def list_gke_hpa(request: Request):
+    return _latest_resources(request, "gke_hpas", _topology_list("gke_hpas"))
 
 
 @app.get("/api/resources/public-ips")
-async def list_public_ips():
+def list_public_ips(request: Request):
     """List all Public IPs from the latest scan."""
-    latest = scan_manager.get_latest_completed_scan()
-    if not latest:
-        return []
-    
-    topo = latest.get("topology", {})
-    return topo.get("public_ips", [])
+    return _latest_resources(request, "public_ips", _topology_list("public_ips"))
 
 
 # ============ Credentials Management Endpoints ============
 
 @app.get("/api/credentials", response_model=List[CredentialInfo])
-async def list_credentials():
+def list_credentials():
     """List all stored credentials."""
     return credentials_manager.list_credentials()
 
 
 @app.get("/api/credentials/active", response_model=Optional[CredentialInfo])
-async def get_active_credential():
+def get_active_credential():
     """Get the currently active credential."""
     return credentials_manager.get_active_credential()
 
@@ -635,9 +764,19 @@ async def upload_credential(
     name: str = Form(...)
 ):
     """Upload a new credential file."""
+    # Read in chunks and stop at the size limit instead of buffering whatever was sent
+    chunks = []
+    size = 0
+    while chunk := await file.read(16 * 1024):
+        size += len(chunk)
+        if size > MAX_CREDENTIAL_BYTES:
+            raise HTTPException(status_code=413, detail=f"Credential file too large (max {MAX_CREDENTIAL_BYTES // 1024} KB)")
+        chunks.append(chunk)
+    
     try:
-        content = await file.read()
-        return credentials_manager.add_credential(content, name)
+        content = b"".join(chunks)
+        # Validates and writes files; keep that off the event loop
+        return await asyncio.to_thread(credentials_manager.add_credential, content, name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -646,7 +785,7 @@ async def upload_credential(
 
 
 @app.post("/api/credentials/{cred_id}/activate", response_model=CredentialInfo)
-async def activate_credential(cred_id: str):
+def activate_credential(cred_id: str):
     """Set a credential as the active one."""
     try:
         return credentials_manager.activate_credential(cred_id)
@@ -655,7 +794,7 @@ async def activate_credential(cred_id: str):
 
 
 @app.delete("/api/credentials/{cred_id}")
-async def delete_credential(cred_id: str):
+def delete_credential(cred_id: str):
     """Delete a credential."""
     try:
         credentials_manager.delete_credential(cred_id)
@@ -669,7 +808,7 @@ class CredentialUpdateRequest(BaseModel):
 
 
 @app.patch("/api/credentials/{cred_id}", response_model=CredentialInfo)
-async def update_credential(cred_id: str, request: CredentialUpdateRequest):
+def update_credential(cred_id: str, request: CredentialUpdateRequest):
     """Update a credential's display name."""
     try:
         return credentials_manager.update_credential_name(cred_id, request.name)
@@ -1,117 +1,491 @@
 
+import bisect
+import itertools
 import json
 import logging
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import shutil
+import threading
+import uuid
 
-from models import NetworkTopology
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from models import NetworkTopology, ScanHistoryItem
+from cidr_analyzer import TopologyIndex
 
 logger = logging.getLogger(__name__)
 
+# Full scans (dict and validated model) kept in memory; the rest are reloaded from disk on demand
+SCAN_CACHE_SIZE = int(os.getenv("SCAN_CACHE_SIZE", "10"))
+
+# Optional Redis shared by all workers: scan JSON under scan:<id>, metadata in the scans:meta hash,
+# and a message on scans:events whenever a scan is saved or deleted
+REDIS_URL = os.getenv("REDIS_URL")
+SCAN_EVENTS_CHANNEL = "scans:events"
+SCAN_METADATA_KEY = "scans:meta"
+# Seconds a scan's JSON stays in Redis (0 keeps it until the scan is deleted); workers fall back
+# to their scans directory once it expires, metadata in scans:meta is kept either way
+REDIS_SCAN_TTL = int(os.getenv("REDIS_SCAN_TTL", "86400"))
+
+# Metadata of every scan file with the file's (mtime_ns, size), kept in the storage directory so
+# startup only has to parse the scan files that changed since it was written
+SCAN_INDEX_FILE = "scans_index.json"
+# Bumped whenever _scan_metadata gains fields, so older indexes are rebuilt from the scan files
+SCAN_INDEX_VERSION = 2
+
+
+class LRU2Cache:
+    """
+    Dict-like cache bounded to `capacity` entries with LRU-2 eviction: the entry whose
+    second-most-recent access is oldest goes first. A scan opened once from the history page is
+    evicted before the latest scan that every analyzer request touches, unlike with plain LRU.
+    Entries for which `pinned(value)` is true are never evicted.
+    """
+    
+    def __init__(self, capacity: int, pinned: Optional[Callable[[Any], bool]] = None):
+        self.capacity = max(1, capacity)
+        self._pinned = pinned or (lambda value: False)
+        self._data: Dict[str, Any] = {}
+        # key -> (second-most-recent, most recent) access tick
+        self._history: Dict[str, Tuple[int, int]] = {}
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+
+    def _touch(self, key: str):
+        _, last = self._history.get(key, (-1, -1))
+        self._history[key] = (last, next(self._clock))
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._touch(key)
+            return self._data[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __setitem__(self, key: str, value):
+        with self._lock:
+            self._data[key] = value
+            self._touch(key)
+            self._evict(keep=key)
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            self._history.pop(key, None)
+            return self._data.pop(key, default)
+
+    def __delitem__(self, key: str):
+        self.pop(key)
+
+    def _evict(self, keep: str):
+        while len(self._data) > self.capacity:
+            candidates = [k for k, v in self._data.items() if k != keep and not self._pinned(v)]
+            if not candidates:
+                return
+            victim = min(candidates, key=self._history.__getitem__)
+            del self._data[victim]
+            del self._history[victim]
+
+
+def summarize_topology(topo: dict) -> dict:
+    """Resource counts of a saved topology, kept with the scan metadata for the summary endpoint."""
+    return {
+        "projects": len(topo.get("projects", [])),
+        "vpcs": topo.get("total_vpcs", 0),
+        "subnets": topo.get("total_subnets", 0),
+        "public_ips": len(topo.get("public_ips", [])),
+        "internal_ips": len(topo.get("used_internal_ips", [])),
+        "instances": len(topo.get("instances", [])),
+        "gke_clusters": len(topo.get("gke_clusters", [])),
+        "gke_pods": len(topo.get("gke_pods", [])),
+        "gke_deployments": len(topo.get("gke_deployments", [])),
+        "gke_services": len(topo.get("gke_services", [])),
+        "storage_buckets": len(topo.get("storage_buckets", [])),
+        "firewall_rules": len(topo.get("firewall_rules", [])),
+    }
+
+
+def _json_serial(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError (f"Type {type(obj)} not serializable")
+
+
+def _scan_metadata(scan_id: str, data: dict) -> dict:
+    """The summary of a scan record kept in memory for listings."""
+    topo = data.get("topology")
+    timestamp = topo.get("scan_timestamp") if topo is not None else data.get("timestamp")
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    return {
+        "scan_id": scan_id,
+        "status": data.get("status"),
+        "timestamp": timestamp,
+        "source_type": topo.get("source_type") if topo is not None else "unknown",
+        "source_id": topo.get("source_id") if topo is not None else "unknown",
+        "total_projects": topo.get("total_projects", 0) if topo is not None else data.get("total_projects", 0),
+        # What get_scan_status reports, so polling doesn't need the full record
+        "progress": data.get("progress", 0),
+        "projects_scanned": data.get("projects_scanned", 0),
+        "error": data.get("error"),
+        "epoch": _epoch(timestamp),
+        "summary": summarize_topology(topo or {}),
+    }
+
+
+def _topology_view(topology: NetworkTopology) -> dict:
+    """
+    What _scan_metadata reads from data["topology"], taken from the model: scalar fields as their
+    JSON values, lists by reference (they are only counted), so no copy of the resources is made.
+    """
+    lists = {name: value for name, value in topology if isinstance(value, list)}
+    return {**topology.model_dump(mode="json", exclude=set(lists)), **lists}
+
+
+def _file_stamp(filepath: str) -> List[int]:
+    stat = os.stat(filepath)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _is_in_progress(data) -> bool:
+    return isinstance(data, dict) and data.get("status") in ("pending", "running")
+
+
+def _epoch(timestamp) -> Optional[float]:
+    """Seconds since the epoch for a datetime or ISO string, so naive and aware timestamps order correctly."""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+    if not isinstance(timestamp, datetime):
+        return None
+    if timestamp.tzinfo is None:
+        # Naive timestamps come from datetime.utcnow()
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def _history_item(scan_id: str, metadata: dict) -> ScanHistoryItem:
+    return ScanHistoryItem(
+        scan_id=scan_id,
+        timestamp=metadata.get("timestamp") or datetime.utcnow(),
+        status=metadata.get("status", "unknown"),
+        source_type=metadata.get("source_type", "unknown"),
+        source_id=metadata.get("source_id", "unknown"),
+        total_projects=metadata.get("total_projects", 0),
+        total_vpcs=0,  # Summary doesn't have these, frontend handles gracefully
+        total_subnets=0
+    )
+
+
+def _history_key(item: ScanHistoryItem) -> float:
+    return _epoch(item.timestamp)
+
+
 class ScanManager:
     """Manages persistence of scan results to disk."""
     
     def __init__(self, storage_dir: str = "data/scans"):
         self.storage_dir = storage_dir
         self.scans_metadata: Dict[str, dict] = {}
-        self.scans_cache: Dict[str, dict] = {}  # Cache for full scan data
+        # Cache for full scan data, bounded; pending / running scans stay until they finish
+        self.scans_cache = LRU2Cache(SCAN_CACHE_SIZE, pinned=_is_in_progress)
         self.latest_completed_scan_id: Optional[str] = None
+        # Validated NetworkTopology per scan, built once from the cached dict (see get_topology)
+        self.topologies = LRU2Cache(SCAN_CACHE_SIZE)
+        # Serialized topology JSON per scan, served as-is by the results endpoint (see get_topology_json)
+        self.topology_json = LRU2Cache(SCAN_CACHE_SIZE)
+        self._topology_lock = threading.Lock()
+        # (topology, TopologyIndex) for the cached latest topology, see get_latest_index
+        self._latest_index: Optional[Tuple[NetworkTopology, TopologyIndex]] = None
+        # (scan dict, {name: value}) for the latest scan, see get_latest_view
+        self._latest_views: Optional[Tuple[dict, Dict[str, Any]]] = None
+        # History items sorted by timestamp (oldest first), updated as scans are saved / deleted
+        self._history: List[ScanHistoryItem] = []
+        self._history_items: Dict[str, ScanHistoryItem] = {}
+        # Guards scans_metadata, the history list and latest_completed_scan_id. Scan dicts themselves
+        # are never mutated once cached: save_scan swaps in a new dict, so readers always see a whole one.
+        self._lock = threading.RLock()
+        # Set by _connect_redis when REDIS_URL is configured
+        self._redis = None
+        self._pubsub_thread = None
+        self._worker_id = uuid.uuid4().hex
+        # {filename: {"stamp": [mtime_ns, size], "metadata": ...}}, mirrored to SCAN_INDEX_FILE
+        self._index: Dict[str, dict] = {}
+        # Called with a scan ID whenever that scan changes, see add_listener
+        self._listeners: List[Callable[[str], None]] = []
         self._ensure_storage_dir()
         
     def _ensure_storage_dir(self):
         """Ensure storage directory exists."""
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
+    
+    def _connect_redis(self):
+        """Share scans with the other workers through Redis, when REDIS_URL is set."""
+        if not REDIS_URL or self._redis is not None:
+            return
+        if not REDIS_AVAILABLE:
+            logger.warning("REDIS_URL is set but the redis package is not installed; scans stay local to this worker")
+            return
+        try:
+            client = redis.Redis.from_url(REDIS_URL)
+            client.ping()
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{SCAN_EVENTS_CHANNEL: self._on_scan_event})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            self._redis = client
+            logger.info("Sharing scans through Redis")
+        except redis.RedisError as e:
+            logger.error(f"Failed to connect to Redis, scans stay local to this worker: {e}")
+    
+    def close(self):
+        """Stop listening for scan events from other workers."""
+        if self._pubsub_thread is not None:
+            self._pubsub_thread.stop()
+            self._pubsub_thread = None
+    
+    def add_listener(self, callback: Callable[[str], None]):
+        """
+        Call `callback(scan_id)` whenever a scan is saved or deleted, here or (through Redis) by
+        another worker. Runs on the saving thread, so callbacks must be quick and thread-safe.
+        """
+        self._listeners.append(callback)
+    
+    def _notify(self, scan_id: str):
+        for callback in self._listeners:
+            try:
+                callback(scan_id)
+            except Exception as e:
+                logger.error(f"Scan listener failed for {scan_id}: {e}")
+    
+    def _publish(self, scan_id: str, serialized: Optional[str] = None, metadata: Optional[dict] = None):
+        """Store (or with no data, remove) a scan in Redis and tell the other workers."""
+        if self._redis is None:
+            return
+        try:
+            pipe = self._redis.pipeline()
+            if serialized is None:
+                pipe.delete(f"scan:{scan_id}")
+                pipe.hdel(SCAN_METADATA_KEY, scan_id)
+            else:
+                pipe.set(f"scan:{scan_id}", serialized, ex=REDIS_SCAN_TTL or None)
+                pipe.hset(SCAN_METADATA_KEY, scan_id, json.dumps(metadata))
+            event = {"origin": self._worker_id, "scan_id": scan_id, "deleted": serialized is None}
+            pipe.publish(SCAN_EVENTS_CHANNEL, json.dumps(event))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Failed to publish scan {scan_id} to Redis: {e}")
+    
+    def _on_scan_event(self, message: dict):
+        """
+        Another worker saved or deleted a scan: drop our cached copies and take its metadata.
+        A delete only forgets the scan here, files in our scans directory are left to their owner.
+        """
+        try:
+            event = json.loads(message["data"])
+            if event.get("origin") == self._worker_id:
+                return
+            scan_id = event["scan_id"]
+            self.topologies.pop(scan_id, None)
+            self.topology_json.pop(scan_id, None)
+            self.scans_cache.pop(scan_id, None)
+            if event.get("deleted"):
+                self._remove_metadata(scan_id)
+                self._index_scan(f"{scan_id}.json", None)
+            else:
+                raw = self._redis.hget(SCAN_METADATA_KEY, scan_id)
+                if raw is not None:
+                    self._apply_metadata(scan_id, json.loads(raw))
+            self._notify(scan_id)
+        except Exception as e:
+            logger.error(f"Failed to handle scan event {message.get('data')!r}: {e}")
+    
+    def _apply_metadata(self, scan_id: str, metadata: dict):
+        """Record a scan's metadata and history item, and make it the latest scan if it's newer."""
+        with self._lock:
+            self.scans_metadata[scan_id] = metadata
+            self._update_history(scan_id, _history_item(scan_id, metadata))
             
+            # Check latest
+            if metadata["status"] == "completed":
+                if not self.latest_completed_scan_id:
+                    self.latest_completed_scan_id = scan_id
+                else:
+                    prev_latest = self.scans_metadata.get(self.latest_completed_scan_id)
+                    if not prev_latest or (metadata["epoch"] is not None and metadata["epoch"] >= (prev_latest["epoch"] or 0.0)):
+                        self.latest_completed_scan_id = scan_id
+    
+    def _remove_metadata(self, scan_id: str):
+        with self._lock:
+            if scan_id in self.scans_metadata:
+                del self.scans_metadata[scan_id]
+            self._update_history(scan_id, None)
+                
+            if scan_id == self.latest_completed_scan_id:
+                self._find_latest()
+    
+    def _find_latest(self):
+        with self._lock:
+            self.latest_completed_scan_id = None
+            for sid, meta in self.scans_metadata.items():
+                if meta["status"] == "completed":
+                    if not self.latest_completed_scan_id or (meta["epoch"] or 0.0) > (self.scans_metadata[self.latest_completed_scan_id]["epoch"] or 0.0):
+                        self.latest_completed_scan_id = sid
+            
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.storage_dir, SCAN_INDEX_FILE), 'r') as f:
+                index = json.load(f)
+            if not isinstance(index, dict) or index.get("version") != SCAN_INDEX_VERSION:
+                return {}
+            return index.get("scans", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable scan index: {e}")
+            return {}
+
+    def _write_index(self):
+        """Write the index atomically, so a crash or another worker never leaves a torn file."""
+        with self._lock:
+            path = os.path.join(self.storage_dir, SCAN_INDEX_FILE)
+            tmp_path = f"{path}.{self._worker_id}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({"version": SCAN_INDEX_VERSION, "scans": self._index}, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"Failed to write scan index: {e}")
+
+    def _index_scan(self, filename: str, filepath: Optional[str], metadata: Optional[dict] = None):
+        """
+        Record (or with filepath=None, drop) a scan file in the index. Only written out when the
+        metadata changes: a stale stamp merely makes the next startup re-read that one file.
+        """
+        with self._lock:
+            entry = self._index.get(filename)
+            if filepath is None:
+                if entry is None:
+                    return
+                del self._index[filename]
+            else:
+                if entry is not None and entry["metadata"] == metadata:
+                    return
+                self._index[filename] = {"stamp": _file_stamp(filepath), "metadata": metadata}
+            self._write_index()
+
     def load_scans(self):
-        """Load scan metadata from disk into memory."""
+        """Load scan metadata from the index, disk (for files the index doesn't cover) and Redis, when configured."""
+        self._connect_redis()
         try:
             loaded_count = 0
+            parsed_count = 0
+            index = self._read_index()
+            fresh_index = {}
             for filename in os.listdir(self.storage_dir):
-                if filename.endswith(".json"):
+                if filename.endswith(".json") and filename != SCAN_INDEX_FILE:
                     try:
                         filepath = os.path.join(self.storage_dir, filename)
-                        # We only read a small portion or just the basics if we want truly lazy,
-                        # but for now, reading the whole file to get metadata is okay as long as we don't keep it all in memory.
-                        with open(filepath, 'r') as f:
-                            data = json.load(f)
+                        stamp = _file_stamp(filepath)
+                        entry = index.get(filename)
+                        if entry is not None and entry.get("stamp") == stamp:
+                            metadata = entry["metadata"]
+                        else:
+                            # New or changed since the index was written: read the whole file for its metadata
+                            with open(filepath, 'r') as f:
+                                data = json.load(f)
                             scan_id = data.get("scan_id")
-                            if scan_id:
-                                # Extract metadata
-                                metadata = {
-                                    "scan_id": scan_id,
-                                    "status": data.get("status"),
-                                    "timestamp": data.get("topology", {}).get("scan_timestamp") if "topology" in data else data.get("timestamp"),
-                                    "source_type": data.get("topology", {}).get("source_type") if "topology" in data else "unknown",
-                                    "source_id": data.get("topology", {}).get("source_id") if "topology" in data else "unknown",
-                                    "total_projects": data.get("topology", {}).get("total_projects", 0) if "topology" in data else data.get("total_projects", 0),
-                                }
-                                self.scans_metadata[scan_id] = metadata
-                                
-                                # Check if it's the latest completed
-                                if metadata["status"] == "completed" and metadata["timestamp"]:
-                                    if not self.latest_completed_scan_id:
+                            metadata = _scan_metadata(scan_id, data) if scan_id else None
+                            parsed_count += 1
+                        fresh_index[filename] = {"stamp": stamp, "metadata": metadata}
+                        if metadata:
+                            scan_id = metadata["scan_id"]
+                            self.scans_metadata[scan_id] = metadata
+                            
+                            # Check if it's the latest completed
+                            if metadata["status"] == "completed" and metadata["epoch"] is not None:
+                                if not self.latest_completed_scan_id:
+                                    self.latest_completed_scan_id = scan_id
+                                else:
+                                    prev_latest = self.scans_metadata[self.latest_completed_scan_id]
+                                    if metadata["epoch"] > prev_latest["epoch"]:
                                         self.latest_completed_scan_id = scan_id
-                                    else:
-                                        prev_latest = self.scans_metadata[self.latest_completed_scan_id]
-                                        if metadata["timestamp"] > prev_latest["timestamp"]:
-                                            self.latest_completed_scan_id = scan_id
-                                            
-                                loaded_count += 1
+                                        
+                            loaded_count += 1
                     except Exception as e:
                         logger.error(f"Failed to load scan file {filename}: {e}")
-            logger.info(f"Loaded {loaded_count} scan metadata items. Latest: {self.latest_completed_scan_id}")
+            with self._lock:
+                self._index = fresh_index
+                if fresh_index != index:
+                    self._write_index()
+            if self._redis is not None:
+                # Scans saved by workers on other hosts
+                shared = self._redis.hgetall(SCAN_METADATA_KEY)
+                for scan_id, raw in shared.items():
+                    self.scans_metadata.setdefault(scan_id.decode(), json.loads(raw))
+                if shared:
+                    self._find_latest()
+            with self._lock:
+                self._history_items = {
+                    scan_id: _history_item(scan_id, metadata) for scan_id, metadata in self.scans_metadata.items()
+                }
+                self._history = sorted(self._history_items.values(), key=_history_key)
+            logger.info(f"Loaded {loaded_count} scan metadata items ({parsed_count} files read). Latest: {self.latest_completed_scan_id}")
         except Exception as e:
             logger.error(f"Error initializing scan loader: {e}")
 
-    def save_scan(self, scan_id: str, data: dict):
-        """Save a scan to disk and update metadata."""
+    def save_scan(self, scan_id: str, data: dict, topology: Optional[NetworkTopology] = None):
+        """
+        Save a scan to disk and update metadata.
+        `topology`, when given, is the scan's result: it is stored as data["topology"], serialized
+        straight from the model, and seeds the topology cache. The record's dict is then left for
+        get_scan to load on demand, rather than kept next to the model and its JSON.
+        """
         try:
-            # Update memory cache
-            self.scans_cache[scan_id] = data
+            if "scan_id" not in data:
+                data = {**data, "scan_id": scan_id}
+            serialized_str = None
+            topology_json = None
+            if topology is not None:
+                # Splice the model's JSON into the record instead of dumping it to dicts and encoding those
+                topology_json = topology.model_dump_json()
+                head = json.dumps({k: v for k, v in data.items() if k != "topology"}, default=_json_serial)
+                serialized_str = f'{head[:-1]}, "topology": {topology_json}}}'
+                metadata = _scan_metadata(scan_id, {**data, "topology": _topology_view(topology)})
+            else:
+                metadata = _scan_metadata(scan_id, data)
+            self.topologies.pop(scan_id, None)
+            self.topology_json.pop(scan_id, None)
             
-            # Update metadata
-            # Prepare timestamp
-            timestamp = data.get("topology", {}).get("scan_timestamp") if "topology" in data else data.get("timestamp")
-            if isinstance(timestamp, datetime):
-                timestamp = timestamp.isoformat()
-
-            metadata = {
-                "scan_id": scan_id,
-                "status": data.get("status"),
-                "timestamp": timestamp,
-                "source_type": data.get("topology", {}).get("source_type") if "topology" in data else "unknown",
-                "source_id": data.get("topology", {}).get("source_id") if "topology" in data else "unknown",
-                "total_projects": data.get("topology", {}).get("total_projects", 0) if "topology" in data else data.get("total_projects", 0),
-            }
-            self.scans_metadata[scan_id] = metadata
+            if metadata["status"] == "completed" and topology is not None:
+                self.topologies[scan_id] = topology
+                self.topology_json[scan_id] = topology_json.encode()
+            self._apply_metadata(scan_id, metadata)
             
-            # Check latest
-            if metadata["status"] == "completed":
-                if not self.latest_completed_scan_id:
-                    self.latest_completed_scan_id = scan_id
-                else:
-                    prev_latest = self.scans_metadata.get(self.latest_completed_scan_id)
-                    if not prev_latest or (metadata["timestamp"] and metadata["timestamp"] >= prev_latest.get("timestamp", "")):
-                        self.latest_completed_scan_id = scan_id
-
-            if "scan_id" not in data:
-                data["scan_id"] = scan_id
-                
-            def json_serial(obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                raise TypeError (f"Type {type(obj)} not serializable")
-
-            serialized_str = json.dumps(data, indent=2, default=json_serial)
+            if serialized_str is None:
+                serialized_str = json.dumps(data, indent=2, default=_json_serial)
+                # Also update cache with serializable version to avoid issues
+                self.scans_cache[scan_id] = json.loads(serialized_str)
             filepath = os.path.join(self.storage_dir, f"{scan_id}.json")
             with open(filepath, 'w') as f:
                 f.write(serialized_str)
+            if topology is not None:
+                # Only once the new file is in place, so get_scan can't reload the previous record
+                self.scans_cache.pop(scan_id, None)
+            self._index_scan(f"{scan_id}.json", filepath, metadata)
             
-            # Also update cache with serializable version to avoid issues
-            self.scans_cache[scan_id] = json.loads(serialized_str)
+            self._publish(scan_id, serialized_str, metadata)
+            self._notify(scan_id)
                 
             logger.debug(f"Saved scan {scan_id} to disk.")
         except Exception as e:
@@ -119,8 +493,19 @@ class ScanManager:
 
     def get_scan(self, scan_id: str) -> Optional[dict]:
         """Get full scan data, loading from disk if not in cache."""
-        if scan_id in self.scans_cache:
-            return self.scans_cache[scan_id]
+        data = self.scans_cache.get(scan_id)
+        if data is not None:
+            return data
+        
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(f"scan:{scan_id}")
+                if raw is not None:
+                    data = json.loads(raw)
+                    self.scans_cache[scan_id] = data
+                    return data
+            except redis.RedisError as e:
+                logger.error(f"Failed to load scan {scan_id} from Redis: {e}")
         
         # Try loading from disk
         filepath = os.path.join(self.storage_dir, f"{scan_id}.json")
@@ -134,31 +519,111 @@ class ScanManager:
                 logger.error(f"Failed to load full scan {scan_id} from disk: {e}")
         return None
 
+    def get_scan_metadata(self, scan_id: str) -> Optional[dict]:
+        return self.scans_metadata.get(scan_id)
+
     def get_all_scans_metadata(self) -> Dict[str, dict]:
-        return self.scans_metadata
+        with self._lock:
+            return dict(self.scans_metadata)
+
+    def get_scan_history(self) -> List[ScanHistoryItem]:
+        """History items, newest first."""
+        return self._history[::-1]
+
+    def _update_history(self, scan_id: str, item: Optional[ScanHistoryItem]):
+        """Replace (or with item=None, remove) a scan's history item, keeping the list sorted."""
+        with self._lock:
+            old = self._history_items.pop(scan_id, None)
+            if old is not None:
+                i = bisect.bisect_left(self._history, _history_key(old), key=_history_key)
+                while self._history[i] is not old:
+                    i += 1
+                del self._history[i]
+            if item is not None:
+                self._history_items[scan_id] = item
+                bisect.insort(self._history, item, key=_history_key)
 
     def get_latest_completed_scan(self) -> Optional[dict]:
         if self.latest_completed_scan_id:
             return self.get_scan(self.latest_completed_scan_id)
         return None
 
+    def get_topology(self, scan_id: str) -> Optional[NetworkTopology]:
+        """
+        A scan's topology as a NetworkTopology.
+        Validated once per scan and shared by every request, instead of rebuilt from the dict each time.
+        """
+        topology = self.topologies.get(scan_id)
+        if topology is not None:
+            return topology
+        
+        with self._topology_lock:
+            topology = self.topologies.get(scan_id)
+            if topology is None:
+                data = self.get_scan(scan_id)
+                if not data or "topology" not in data:
+                    return None
+                topology = NetworkTopology(**data["topology"])
+                self.topologies[scan_id] = topology
+            return topology
+
+    def get_topology_json(self, scan_id: str) -> Optional[bytes]:
+        """A scan's topology serialized to JSON bytes, encoded once per scan (see get_topology)."""
+        payload = self.topology_json.get(scan_id)
+        if payload is None:
+            topology = self.get_topology(scan_id)
+            if topology is None:
+                return None
+            payload = topology.model_dump_json().encode()
+            self.topology_json[scan_id] = payload
+        return payload
+
+    def get_latest_topology(self) -> Optional[NetworkTopology]:
+        """The latest completed scan's topology (see get_topology)."""
+        if self.latest_completed_scan_id:
+            return self.get_topology(self.latest_completed_scan_id)
+        return None
+
+    def get_latest_index(self) -> Optional[TopologyIndex]:
+        """Subnet / VPC lookups for the latest topology, built on first use and reused until the topology changes."""
+        topology = self.get_latest_topology()
+        if topology is None:
+            return None
+        cached = self._latest_index
+        if cached and cached[0] is topology:
+            return cached[1]
+        index = TopologyIndex(topology)
+        self._latest_index = (topology, index)
+        return index
+
+    def get_latest_view(self, name: str, build: Callable[[dict], Any]) -> Any:
+        """
+        `build(topology_dict)` for the latest completed scan, computed once per scan and name and
+        reused until the latest scan (or its cached dict) changes. None when there is no scan.
+        """
+        data = self.get_latest_completed_scan()
+        if not data:
+            return None
+        views = self._latest_views
+        if views is None or views[0] is not data:
+            views = (data, {})
+            self._latest_views = views
+        if name not in views[1]:
+            views[1][name] = build(data.get("topology", {}))
+        return views[1][name]
+
     def delete_scan(self, scan_id: str):
-        if scan_id in self.scans_metadata:
-            del self.scans_metadata[scan_id]
-        if scan_id in self.scans_cache:
-            del self.scans_cache[scan_id]
-            
-        if scan_id == self.latest_completed_scan_id:
-            self.latest_completed_scan_id = None
-            # Re-find latest
-            for sid, meta in self.scans_metadata.items():
-                if meta["status"] == "completed":
-                    if not self.latest_completed_scan_id or meta["timestamp"] > self.scans_metadata[self.latest_completed_scan_id]["timestamp"]:
-                        self.latest_completed_scan_id = sid
+        self.topologies.pop(scan_id, None)
+        self.topology_json.pop(scan_id, None)
+        self.scans_cache.pop(scan_id, None)
+        self._remove_metadata(scan_id)
         
         filepath = os.path.join(self.storage_dir, f"{scan_id}.json")
         if os.path.exists(filepath):
             os.remove(filepath)
+        self._index_scan(f"{scan_id}.json", None)
+        self._publish(scan_id)
+        self._notify(scan_id)
 
 # Global instance
 scan_manager = ScanManager()
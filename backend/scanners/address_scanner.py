@@ -1,17 +1,84 @@
 
 import logging
-from typing import List, Any
+from typing import List, Any, NamedTuple, Tuple
+from concurrent.futures import as_completed
 from google.cloud import compute_v1
 
 from models import PublicIP, UsedInternalIP
-from .base import BaseScanner
+from .base import BaseScanner, field_mask, short_name
 
 logger = logging.getLogger(__name__)
 
+
+# Users-field URL category (e.g. .../instances/vm-1) -> resource_type, in priority order
+USER_TYPES = {
+    "instances": "VM",
+    "forwardingRules": "LoadBalancer (Indirect)",
+    "routers": "CloudNAT",
+}
+
+
+def _classify_users(users) -> str:
+    """Resource type of an in-use address from its users field; unmapped categories are passed through."""
+    categories = [short_name(u.rpartition("/")[0]) for u in users]
+    for category, resource_type in USER_TYPES.items():
+        if category in categories:
+            return resource_type
+    return categories[0] if categories else "Unknown"
+
+
+class AddressRecord(NamedTuple):
+    """The fields of a compute Address that scan_addresses reads, copied out of the page proto."""
+    name: str
+    address: str
+    address_type: str
+    status: str
+    users: Tuple[str, ...]
+    region: str
+    network: str
+    subnetwork: str
+    description: str
+    self_link: str
+
+
 class AddressScanner(BaseScanner):
     """Scanner for Public and Internal IP addresses and forwarding rules."""
+
+    # Largest page size the Compute API accepts; fewer pages per aggregated listing.
+    # No server-side type filter: one listing feeds both the EXTERNAL and INTERNAL passes.
+    PAGE_SIZE = 500
+
+    # Partial-response masks: only the fields scan_addresses / resolve_lb_details read are returned.
+    ADDRESS_MASK = field_mask(
+        "items/*/addresses("
+        "name,address,addressType,status,users,region,network,subnetwork,description,selfLink)"
+    )
+    FORWARDING_RULE_MASK = field_mask(
+        "items/*/forwardingRules("
+        "name,IPAddress,IPProtocol,portRange,ports,target,backendService,loadBalancingScheme,"
+        "region,network,subnetwork,description,selfLink)"
+    )
+    
+    def __init__(self, max_workers: int = 10, credentials=None, executor=None):
+        super().__init__(max_workers, credentials, executor)
+        # Clients are shared across projects so channels/credentials are set up once
+        self.addresses_client = compute_v1.AddressesClient(credentials=self.credentials)
+        self.forwarding_rules_client = compute_v1.ForwardingRulesClient(credentials=self.credentials)
+
+    class ProjectAddressContext:
+        """Holds one project's addresses and forwarding rules, shared by the EXTERNAL and INTERNAL passes."""
+        def __init__(self, addresses: List[Any] = None, forwarding_rules: List[Any] = None):
+            self.addresses = addresses or []
+            self.forwarding_rules = forwarding_rules or []
+
+    def prefetch_addresses(self, project_id: str) -> 'ProjectAddressContext':
+        """List addresses and forwarding rules once per project, issuing both listings concurrently."""
+        with self._fanout(2) as executor:
+            f_addresses = executor.submit(self._list_addresses, project_id)
+            f_fwd_rules = executor.submit(self._list_forwarding_rules, project_id)
+            return self.ProjectAddressContext(f_addresses.result(), f_fwd_rules.result())
     
-    def scan_addresses(self, project_id: str, address_type: str, lb_scanner=None, subnet_map: dict = None, lb_context: Any = None) -> List[Any]:
+    def scan_addresses(self, project_id: str, address_type: str, lb_scanner=None, subnet_map: dict = None, lb_context: Any = None, address_context: Any = None) -> List[Any]:
         """
         Scans addresses (Forwarding Rules & Static IPs) to find LBs.
         
@@ -21,64 +88,39 @@ class AddressScanner(BaseScanner):
             lb_scanner: Instance of LBScanner to resolve LB details.
             subnet_map: Map of Subnet URL -> VPC Name.
             lb_context: Prefetched LB resources.
+            address_context: Prefetched addresses / forwarding rules (see prefetch_addresses).
         
         Returns:
             List of PublicIP or UsedInternalIP objects.
         """
         results = []
-        try:
-            # Initialize clients with credentials
-            addresses_client = compute_v1.AddressesClient(credentials=self.credentials)
-            fwd_client = compute_v1.ForwardingRulesClient(credentials=self.credentials)
-            
-            # List regional and global addresses via aggregated_list
-            all_addr = []
-            try:
-                 for r, addr_list in addresses_client.aggregated_list(project=project_id):
-                     if addr_list.addresses:
-                         all_addr.extend(addr_list.addresses)
-            except Exception as e:
-                logger.debug(f"Error listing addresses for {project_id}: {e}")
-            
-            # Dedupe addresses by self_link
-            unique_addr = {}
-            for a in all_addr:
-                if a.self_link not in unique_addr:
-                    unique_addr[a.self_link] = a
-            all_addr = list(unique_addr.values())
-
-            # Filter by type
-            target_addr = []
-            for a in all_addr:
-                if address_type == "EXTERNAL" and a.address_type == "EXTERNAL":
-                    target_addr.append(a)
-                elif address_type == "INTERNAL" and a.address_type != "EXTERNAL":
-                    target_addr.append(a)
-            
-            # 0. Prefetch Resources (if not provided)
-            if not lb_context and lb_scanner and hasattr(lb_scanner, 'prefetch_resources'):
-                lb_context = lb_scanner.prefetch_resources(project_id)
+        # Reuse the listings when the caller already fetched them for the other address type.
+        # Listing failures are handled per scope in _list_addresses / _list_forwarding_rules,
+        # so whatever was reachable is always processed here.
+        if not address_context:
+            address_context = self.prefetch_addresses(project_id)
+        all_addr = address_context.addresses
+        fwd_rules = address_context.forwarding_rules
 
-            # 1. Get Forwarding Rules (LBs) via aggregated_list
-            fwd_rules = []
+        # Filter by type
+        target_addr = []
+        for a in all_addr:
+            if address_type == "EXTERNAL" and a.address_type == "EXTERNAL":
+                target_addr.append(a)
+            elif address_type == "INTERNAL" and a.address_type != "EXTERNAL":
+                target_addr.append(a)
+        
+        # 0. Prefetch Resources (if not provided)
+        if not lb_context and lb_scanner:
+            lb_context = lb_scanner.prefetch_resources(project_id)
+        
+        # Map IP to FwdRule
+        ip_to_fwd = {fr.I_p_address: fr for fr in fwd_rules if fr.I_p_address}
+        # LB details are resolved after the partitioning pass so their lookups can overlap
+        pending_details = []
+        
+        for addr in target_addr:
             try:
-                for r, list_obj in fwd_client.aggregated_list(project=project_id):
-                    if list_obj.forwarding_rules:
-                        fwd_rules.extend(list_obj.forwarding_rules)
-            except Exception as e:
-                logger.debug(f"Error listing forwarding rules for {project_id}: {e}")
-
-            # Dedupe forwarding rules by self_link
-            unique_fwd = {}
-            for fr in fwd_rules:
-                if fr.self_link not in unique_fwd:
-                    unique_fwd[fr.self_link] = fr
-            fwd_rules = list(unique_fwd.values())
-            
-            # Map IP to FwdRule
-            ip_to_fwd = {fr.I_p_address: fr for fr in fwd_rules if fr.I_p_address}
-            
-            for addr in target_addr:
                 # Basic info
                 is_reserved = (addr.status == "RESERVED")
                 is_in_use = (addr.status == "IN_USE")
@@ -86,10 +128,6 @@ class AddressScanner(BaseScanner):
                 # Check for LB
                 fwd_rule = ip_to_fwd.get(addr.address)
                 
-                lb_details = None
-                if fwd_rule and lb_scanner:
-                    lb_details = lb_scanner.resolve_lb_details(fwd_rule, project_id, context=lb_context)
-                
                 # Try to determine resource type if not LB
                 resource_type = "Unknown"
                 if fwd_rule:
@@ -97,13 +135,7 @@ class AddressScanner(BaseScanner):
                 elif is_in_use:
                     # Check users field
                     if addr.users:
-                        methods = [u.split("/")[-2] for u in addr.users] # e.g. instances, forwardingRules
-                        if "instances" in methods:
-                            resource_type = "VM"
-                        elif "forwardingRules" in methods:
-                            resource_type = "LoadBalancer (Indirect)"
-                        else:
-                            resource_type = methods[0] if methods else "Unknown"
+                        resource_type = _classify_users(addr.users)
                     else:
                         resource_type = "In Use (Unknown)"
                 else:
@@ -115,15 +147,14 @@ class AddressScanner(BaseScanner):
                         resource_type=resource_type,
                         resource_name=fwd_rule.name if fwd_rule else addr.name,
                         project_id=project_id,
-                        region=addr.region.split("/")[-1] if addr.region else "global",
+                        region=short_name(addr.region) if addr.region else "global",
                         status="IN_USE" if is_in_use else "RESERVED",
-                        description=addr.description,
-                        details=lb_details
+                        description=addr.description
                     ))
                 else: 
                      # Internal
-                     vpc_name = addr.network.split("/")[-1] if addr.network else "unknown"
-                     subnet_name = addr.subnetwork.split("/")[-1] if addr.subnetwork else "unknown"
+                     vpc_name = short_name(addr.network) if addr.network else "unknown"
+                     subnet_name = short_name(addr.subnetwork) if addr.subnetwork else "unknown"
                      
                      # Fallback check
                      if vpc_name == "unknown" and subnet_map and addr.subnetwork:
@@ -136,49 +167,94 @@ class AddressScanner(BaseScanner):
                         project_id=project_id,
                         vpc=vpc_name,
                         subnet=subnet_name,
-                        region=addr.region.split("/")[-1] if addr.region else "global",
-                        description=addr.description,
-                        details=lb_details
+                        region=short_name(addr.region) if addr.region else "global",
+                        description=addr.description
                      ))
-            
-            processed_ips = set(a.address for a in target_addr)
-            
-            for fr in fwd_rules:
-                if fr.I_p_address and fr.I_p_address not in processed_ips:
-                    
-                    is_external = (fr.load_balancing_scheme == "EXTERNAL" or fr.load_balancing_scheme == "EXTERNAL_MANAGED")
-                    
-                    if (address_type == "EXTERNAL" and is_external) or (address_type == "INTERNAL" and not is_external):
-                         lb_details = None
-                         if lb_scanner:
-                             lb_details = lb_scanner.resolve_lb_details(fr, project_id, context=lb_context)
-
-                         if address_type == "EXTERNAL":
-                             results.append(PublicIP(
+                if fwd_rule:
+                    pending_details.append((results[-1], fwd_rule))
+            except Exception as e:
+                logger.warning(f"Skipping address {addr.name} in {project_id}: {e}")
+        
+        processed_ips = set(a.address for a in target_addr)
+        
+        for fr in fwd_rules:
+            if fr.I_p_address and fr.I_p_address not in processed_ips:
+                
+                is_external = (fr.load_balancing_scheme == "EXTERNAL" or fr.load_balancing_scheme == "EXTERNAL_MANAGED")
+                
+                if (address_type == "EXTERNAL" and is_external) or (address_type == "INTERNAL" and not is_external):
+                    try:
+                        if address_type == "EXTERNAL":
+                            results.append(PublicIP(
                                 ip_address=fr.I_p_address,
                                 resource_type="LoadBalancer",
                                 resource_name=fr.name,
                                 project_id=project_id,
-                                region=fr.region.split("/")[-1] if fr.region else "global",
+                                region=short_name(fr.region) if fr.region else "global",
                                 status="IN_USE",
-                                description=fr.description,
-                                details=lb_details
+                                description=fr.description
                             ))
-                         else:
-                             results.append(UsedInternalIP(
+                        else:
+                            results.append(UsedInternalIP(
                                 ip_address=fr.I_p_address,
                                 resource_type="LoadBalancer",
                                 resource_name=fr.name,
                                 project_id=project_id,
-                                vpc=fr.network.split("/")[-1] if fr.network else "unknown",
-                                subnet=fr.subnetwork.split("/")[-1] if fr.subnetwork else "unknown",
-                                region=fr.region.split("/")[-1] if fr.region else "global",
-                                description=fr.description,
-                                details=lb_details
-                             ))
-                    
+                                vpc=short_name(fr.network) if fr.network else "unknown",
+                                subnet=short_name(fr.subnetwork) if fr.subnetwork else "unknown",
+                                region=short_name(fr.region) if fr.region else "global",
+                                description=fr.description
+                            ))
+                        pending_details.append((results[-1], fr))
+                    except Exception as e:
+                        logger.warning(f"Skipping forwarding rule {fr.name} in {project_id}: {e}")
 
-        except Exception as e:
-            logger.warning(f"Error scanning addresses in {project_id}: {e}")
+        if lb_scanner and pending_details:
+            self._resolve_pending_details(project_id, lb_scanner, lb_context, pending_details)
             
         return results
+
+    def _resolve_pending_details(self, project_id: str, lb_scanner, lb_context: Any, pending_details: List[Tuple[Any, Any]]):
+        """Resolve LB details for (ip entry, forwarding rule) pairs in parallel and attach them to the entries."""
+        with self._fanout(min(self.max_workers, len(pending_details))) as executor:
+            future_to_entry = {
+                executor.submit(lb_scanner.resolve_lb_details, fwd_rule, project_id, context=lb_context): entry
+                for entry, fwd_rule in pending_details
+            }
+            for future in as_completed(future_to_entry):
+                entry = future_to_entry[future]
+                try:
+                    entry.details = future.result()
+                except Exception as e:
+                    logger.warning(f"Could not resolve LB details for {entry.resource_name} in {project_id}: {e}")
+
+    def _list_addresses(self, project_id: str) -> List[AddressRecord]:
+        """List regional and global addresses via aggregated_list, deduped by self_link."""
+        unique_addr = {}
+        try:
+            request = compute_v1.AggregatedListAddressesRequest(project=project_id, max_results=self.PAGE_SIZE)
+            # Stream each page straight into light records so the page protos can be released
+            for r, addr_list in self.addresses_client.aggregated_list(request=request, metadata=self.ADDRESS_MASK):
+                for a in addr_list.addresses:
+                    if a.self_link not in unique_addr:
+                        unique_addr[a.self_link] = AddressRecord(
+                            a.name, a.address, a.address_type, a.status, tuple(a.users),
+                            a.region, a.network, a.subnetwork, a.description, a.self_link
+                        )
+        except Exception as e:
+            logger.warning(f"Error listing addresses for {project_id}, keeping {len(unique_addr)} listed so far: {e}")
+        return list(unique_addr.values())
+
+    def _list_forwarding_rules(self, project_id: str) -> List[Any]:
+        """List regional and global forwarding rules via aggregated_list, deduped by self_link."""
+        unique_fwd = {}
+        try:
+            request = compute_v1.AggregatedListForwardingRulesRequest(project=project_id, max_results=self.PAGE_SIZE)
+            # Rules stay as protos: resolve_lb_details reads target/backend fields from them
+            for r, list_obj in self.forwarding_rules_client.aggregated_list(request=request, metadata=self.FORWARDING_RULE_MASK):
+                for fr in list_obj.forwarding_rules:
+                    if fr.self_link not in unique_fwd:
+                        unique_fwd[fr.self_link] = fr
+        except Exception as e:
+            logger.warning(f"Error listing forwarding rules for {project_id}, keeping {len(unique_fwd)} listed so far: {e}")
+        return list(unique_fwd.values())
@@ -1,25 +1,138 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+import google.auth
 from google.cloud import resourcemanager_v3, compute_v1
 
 from credentials_manager import credentials_manager
 
 logger = logging.getLogger(__name__)
 
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+
+
+@lru_cache(maxsize=65536)
+def short_name(url: str) -> str:
+    """
+    Last segment of a resource URL (".../networks/default" -> "default").
+    Cached and interned: the same network / subnet / region URLs recur across every resource.
+    """
+    return sys.intern(url.rpartition("/")[2])
+
+
+def _use_active_credential_file():
+    """Point Application Default Credentials at the credential file selected in the credentials manager."""
+    cred_path = credentials_manager.get_active_credential_path()
+    if cred_path:
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = cred_path
+
+
+def default_credentials():
+    """
+    Resolve Application Default Credentials once, for the active credential file.
+    Passing the same object to every client means one token fetch and one refresh schedule per scan.
+    """
+    _use_active_credential_file()
+    credentials, _ = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
+    return credentials
+
+
+def field_mask(items_fields: str) -> tuple:
+    """
+    Request metadata asking for a partial response (x-goog-fieldmask) limited to `items_fields`,
+    e.g. "items(name,network)". nextPageToken is always included: without it in the mask,
+    pagination stops after the first page.
+    """
+    return (("x-goog-fieldmask", f"nextPageToken,{items_fields}"),)
+
+
+def default_max_workers() -> int:
+    """Default pool size: scans are I/O bound, so a few threads per core, capped at 32."""
+    return min(32, 4 * (os.cpu_count() or 1))
+
+
+class SharedExecutor:
+    """
+    Long-lived thread pool shared by the orchestrator and the scanners for leaf work.
+    Work submitted from one of the pool's own threads runs inline in that thread,
+    so a task that fans out and waits on its children can never starve the pool.
+    """
+    
+    def __init__(self, max_workers: int = None, thread_name_prefix: str = "gcpscan"):
+        self.max_workers = max_workers or default_max_workers()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=thread_name_prefix,
+            initializer=self._mark_worker
+        )
+
+    def _mark_worker(self):
+        self._local.is_worker = True
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not getattr(self._local, 'is_worker', False):
+            return self._pool.submit(fn, *args, **kwargs)
+        
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    def map(self, fn, *iterables):
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return (future.result() for future in futures)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+
 class BaseScanner:
     """Base class for all GCP resource scanners."""
     
-    def __init__(self, max_workers: int = 10, credentials=None):
+    def __init__(self, max_workers: int = 10, credentials=None, executor: SharedExecutor = None):
         self.max_workers = max_workers
         self.credentials = credentials
+        # Long-lived pool for RPC fan-out inside scanner methods, injected by GCPScanner;
+        # None when a scanner is used standalone (see _fanout)
+        self.executor = executor
+        # API clients built on first use and reused across projects (see _client)
+        self._clients = {}
+        self._clients_lock = threading.Lock()
         
         # Determine credentials if not provided
         if not self.credentials:
-            cred_path = credentials_manager.get_active_credential_path()
-            if cred_path:
-                import os
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = cred_path
+            _use_active_credential_file()
         
         # Common managers/clients can be initialized lazily or here
         # For now we'll init ProjectsClient as it's commonly used for auth check
         self.projects_client = resourcemanager_v3.ProjectsClient(credentials=self.credentials)
+
+    @contextmanager
+    def _fanout(self, max_workers: int):
+        """
+        Executor for one method's concurrent RPCs: the injected shared pool, so no threads are
+        started per call, or a pool of `max_workers` for the duration of the block when standalone.
+        """
+        if self.executor is not None:
+            yield self.executor
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor
+
+    def _client(self, client_cls):
+        """Return this scanner's shared `client_cls` instance, creating it on first use."""
+        client = self._clients.get(client_cls)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(client_cls)
+                if client is None:
+                    client = client_cls(credentials=self.credentials)
+                    self._clients[client_cls] = client
+        return client
@@ -1,50 +1,67 @@
 
 import logging
+import sys
 from typing import List, Optional
 from google.cloud import compute_v1
 from google.api_core import exceptions as gcp_exceptions
 
 from models import FirewallRule, CloudArmorPolicy, CloudArmorRule
-from .base import BaseScanner
+from .base import BaseScanner, field_mask, short_name
 
 logger = logging.getLogger(__name__)
 
+# CEL term for one range of a basic-mode (SRC_IPS_V1) rule
+IN_IP_RANGE = "inIpRange(origin.ip, '%s')"
+
+
+def _match_expression(match) -> Optional[str]:
+    """CEL expression of a Cloud Armor rule; basic-mode source-range matches are rendered as inIpRange terms."""
+    if not match:
+        return None
+    if match.expr:
+        return match.expr.expression
+    if match.config and match.config.src_ip_ranges:
+        return " || ".join(IN_IP_RANGE % ip for ip in match.config.src_ip_ranges)
+    return None
+
 class FirewallScanner(BaseScanner):
     """Scanner for Firewall Rules and Cloud Armor Policies."""
+
+    # Partial-response masks: only the fields mapped into the models.
+    FIREWALL_MASK = field_mask(
+        "items(name,direction,priority,sourceRanges,destinationRanges,sourceTags,"
+        "targetTags,allowed,denied,network,disabled,description)"
+    )
+    SECURITY_POLICY_MASK = field_mask(
+        "items(name,description,selfLink,adaptiveProtectionConfig,"
+        "rules(priority,action,description,match,preview))"
+    )
     
     def scan_firewalls(self, project_id: str) -> List[FirewallRule]:
         """List all firewall rules in a project."""
         rules = []
-        firewalls_client = compute_v1.FirewallsClient(credentials=self.credentials)
+        firewalls_client = self._client(compute_v1.FirewallsClient)
         
         try:
             request = compute_v1.ListFirewallsRequest(project=project_id)
             
-            for fw in firewalls_client.list(request=request):
+            intern = sys.intern
+            for fw in firewalls_client.list(request=request, metadata=self.FIREWALL_MASK):
+                # Each repeated-field access wraps the proto again; read allowed/denied once
+                allowed, denied = fw.allowed, fw.denied
+                # Direction, protocol and network names repeat across every rule; intern them
                 rule = FirewallRule(
                     name=fw.name,
-                    direction=fw.direction,
-                    action="ALLOW" if fw.allowed else "DENY",
+                    direction=intern(fw.direction),
+                    action="ALLOW" if allowed else "DENY",
                     priority=fw.priority,
                     source_ranges=list(fw.source_ranges),
                     destination_ranges=list(fw.destination_ranges),
                     source_tags=list(fw.source_tags),
                     target_tags=list(fw.target_tags),
-                    allowed=[
-                        {
-                            "IPProtocol": allowed.I_p_protocol,
-                            "ports": list(allowed.ports)
-                        }
-                        for allowed in fw.allowed
-                    ],
-                    denied=[
-                        {
-                            "IPProtocol": denied.I_p_protocol,
-                            "ports": list(denied.ports)
-                        }
-                        for denied in fw.denied
-                    ],
-                    vpc_network=fw.network.split("/")[-1],
+                    allowed=[{"IPProtocol": intern(r.I_p_protocol), "ports": list(r.ports)} for r in allowed],
+                    denied=[{"IPProtocol": intern(r.I_p_protocol), "ports": list(r.ports)} for r in denied],
+                    vpc_network=short_name(fw.network),
                     project_id=project_id,
                     disabled=fw.disabled,
                     description=fw.description
@@ -61,12 +78,12 @@ class FirewallScanner(BaseScanner):
     def scan_cloud_armor(self, project_id: str) -> List[CloudArmorPolicy]:
         """List all Cloud Armor security policies in a project."""
         policies = []
-        security_policies_client = compute_v1.SecurityPoliciesClient(credentials=self.credentials)
+        security_policies_client = self._client(compute_v1.SecurityPoliciesClient)
         
         try:
             request = compute_v1.ListSecurityPoliciesRequest(project=project_id)
             
-            for policy in security_policies_client.list(request=request):
+            for policy in security_policies_client.list(request=request, metadata=self.SECURITY_POLICY_MASK):
                 # Only scan CLOUD_ARMOR type policies (ignore EDGE or internal if needed, 
                 # but generally we want them all if they are security policies)
                 
@@ -77,15 +94,16 @@ class FirewallScanner(BaseScanner):
                             priority=r.priority,
                             action=r.action,
                             description=r.description,
-                            match_expression=r.match.expr.expression if r.match and r.match.expr else None,
+                            match_expression=_match_expression(r.match),
                             preview=r.preview
                         ))
                 
+                apc = policy.adaptive_protection_config
                 policies.append(CloudArmorPolicy(
                     name=policy.name,
                     description=policy.description,
                     rules=rules,
-                    adaptive_protection_enabled=False if not policy.adaptive_protection_config else policy.adaptive_protection_config.layer7_ddos_defense_config.enable,
+                    adaptive_protection_enabled=bool(apc and apc.layer7_ddos_defense_config.enable),
                     project_id=project_id,
                     self_link=policy.self_link
                 ))
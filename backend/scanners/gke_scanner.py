@@ -4,9 +4,11 @@ import tempfile
 import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 import yaml
 
+import google.auth
+from google.auth.transport.requests import Request
 from google.cloud import container_v1
 try:
     from kubernetes import client as k8s_client
@@ -17,7 +19,7 @@ except ImportError:
     Configuration = None
     K8S_AVAILABLE = False
 
-from scanners.base import BaseScanner
+from scanners.base import BaseScanner, CLOUD_PLATFORM_SCOPE
 from models import (
     GKECluster, GKEPod, GKEDeployment, GKEService, 
     GKEIngress, GKEConfigMap, GKESecret, GKEPVC, GKEContainer, GKEHPA,
@@ -60,7 +62,7 @@ class GKEConsistentScanner(BaseScanner):
             }
 
         # Scan workloads in parallel across clusters
-        with ThreadPoolExecutor(max_workers=min(len(raw_clusters) or 1, 10)) as executor:
+        with self._fanout(min(len(raw_clusters) or 1, 10)) as executor:
             future_to_cluster = {
                 executor.submit(self._scan_cluster_resources, project_id, c): c
                 for c in raw_clusters
@@ -105,7 +107,7 @@ class GKEConsistentScanner(BaseScanner):
 
     def _list_raw_clusters(self, project_id: str):
         try:
-            client = container_v1.ClusterManagerClient(credentials=self.credentials)
+            client = self._client(container_v1.ClusterManagerClient)
             parent = f"projects/{project_id}/locations/-"
             request = container_v1.ListClustersRequest(parent=parent)
             response = client.list_clusters(request=request)
@@ -127,7 +129,7 @@ class GKEConsistentScanner(BaseScanner):
             services_ipv4_cidr=cluster.ip_allocation_policy.services_ipv4_cidr_block,
             pods_ipv4_cidr=cluster.ip_allocation_policy.cluster_ipv4_cidr_block,
             node_count=cluster.current_node_count,
-            labels=dict(cluster.resource_labels)
+            labels=cluster.resource_labels
         )
 
     def _get_k8s_client(self, cluster) -> Optional[Any]:
@@ -142,12 +144,11 @@ class GKEConsistentScanner(BaseScanner):
         try:
             # Lazy load credentials if missing
             if not self.credentials:
-                import google.auth
-                self.credentials, _ = google.auth.default(scopes=['https://www.googleapis.com/auth/cloud-platform'])
+                self.credentials, _ = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
             
-            # Refresh GCP credentials
-            from google.auth.transport.requests import Request
-            self.credentials.refresh(Request())
+            # Credentials are shared across clusters (and scanners); refresh only when the token is missing or expired
+            if not self.credentials.valid:
+                self.credentials.refresh(Request())
             
             configuration = Configuration()
             configuration.host = f"https://{cluster.endpoint}"
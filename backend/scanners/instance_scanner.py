@@ -1,7 +1,9 @@
 import logging
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Any, Optional, Set, Tuple
+from concurrent.futures import as_completed
 from google.cloud import compute_v1
-from scanners.base import BaseScanner
+from scanners.base import BaseScanner, field_mask, short_name
 from models import GCEInstance
 from datetime import datetime
 
@@ -9,80 +11,109 @@ logger = logging.getLogger(__name__)
 
 class GCEInstanceScanner(BaseScanner):
     """Scanner for GCE VM Instances."""
+
+    # Partial-response mask for the aggregated listing: only the fields mapped into GCEInstance.
+    INSTANCE_MASK = field_mask(
+        "items/*/instances("
+        "name,machineType,status,creationTimestamp,labels,tags/items,serviceAccounts/email,"
+        "networkInterfaces(networkIP,network,subnetwork,accessConfigs/natIP))"
+    )
+    
+    def __init__(self, max_workers: int = 10, credentials=None, executor=None):
+        super().__init__(max_workers, credentials, executor)
+        # Clients are shared across projects so channels/credentials are set up once
+        self.instances_client = compute_v1.InstancesClient(credentials=self.credentials)
+        self.machine_types_client = compute_v1.MachineTypesClient(credentials=self.credentials)
     
     def scan_instances(self, project_id: str) -> List[GCEInstance]:
         """Scans for all GCE instances across all zones in a project."""
         logger.info(f"Scanning GCE instances in project {project_id}")
         instances = []
-        
-        # Cache for machine types to avoid redundant API calls
-        # Key: (zone, machine_type_name), Value: (cpu_count, memory_mb)
-        machine_type_cache = {}
+        # Machine types are resolved after listing, once per distinct (zone, machine_type_name)
+        instance_machine_types = []
         
         try:
-            client = compute_v1.InstancesClient(credentials=self.credentials)
-            mt_client = compute_v1.MachineTypesClient(credentials=self.credentials)
-            
             # Use aggregated_list to get instances across all zones
             request = compute_v1.AggregatedListInstancesRequest(project=project_id)
             
-            for zone, instances_in_zone in client.aggregated_list(request=request):
+            # Per-instance hot loop: bind the callables it uses once
+            intern = sys.intern
+            add_instance = instances.append
+            add_machine_type = instance_machine_types.append
+            for zone, instances_in_zone in self.instances_client.aggregated_list(request=request, metadata=self.INSTANCE_MASK):
                 if not instances_in_zone.instances:
                     continue
                 
                 # Zone name is usually 'zones/us-central1-a'
-                zone_name = zone.split('/')[-1]
+                zone_name = zone.rpartition('/')[2]
                 
                 for inst in instances_in_zone.instances:
-                    # Extract network and subnet info
-                    network_interfaces = inst.network_interfaces
-                    primary_if = network_interfaces[0] if network_interfaces else None
-                    
-                    internal_ip = primary_if.network_i_p if primary_if else None
-                    external_ip = None
-                    if primary_if and primary_if.access_configs:
-                        external_ip = primary_if.access_configs[0].nat_i_p
-                    
-                    network_url = primary_if.network if primary_if else ""
-                    subnet_url = primary_if.subnetwork if primary_if else ""
+                    try:
+                        # Extract network and subnet info
+                        network_interfaces = inst.network_interfaces
+                        primary_if = network_interfaces[0] if network_interfaces else None
                     
-                    # Machine type info
-                    mt_name = inst.machine_type.split('/')[-1]
-                    cpu_count = None
-                    memory_mb = None
+                        internal_ip = primary_if.network_i_p if primary_if else None
+                        external_ip = None
+                        access_configs = primary_if.access_configs if primary_if else None
+                        if access_configs:
+                            external_ip = access_configs[0].nat_i_p
                     
-                    cache_key = (zone_name, mt_name)
-                    if cache_key in machine_type_cache:
-                        cpu_count, memory_mb = machine_type_cache[cache_key]
-                    else:
-                        try:
-                            mt_info = mt_client.get(project=project_id, zone=zone_name, machine_type=mt_name)
-                            cpu_count = mt_info.guest_cpus
-                            memory_mb = mt_info.memory_mb
-                            machine_type_cache[cache_key] = (cpu_count, memory_mb)
-                        except Exception as mt_e:
-                            logger.warning(f"Could not fetch machine type {mt_name} in {zone_name}: {mt_e}")
+                        # Network / subnet URLs, machine types and statuses repeat across instances; intern them
+                        network_url = intern(primary_if.network) if primary_if else ""
+                        subnet_url = intern(primary_if.subnetwork) if primary_if else ""
                     
-                    instances.append(GCEInstance(
-                        name=inst.name,
-                        project_id=project_id,
-                        zone=zone_name,
-                        machine_type=mt_name,
-                        status=inst.status,
-                        internal_ip=internal_ip,
-                        external_ip=external_ip,
-                        network=network_url,
-                        subnet=subnet_url,
-                        tags=list(inst.tags.items) if inst.tags else [],
-                        labels=dict(inst.labels) if inst.labels else {},
-                        service_accounts=[sa.email for sa in inst.service_accounts] if inst.service_accounts else [],
-                        creation_timestamp=datetime.fromisoformat(inst.creation_timestamp) if inst.creation_timestamp else None,
-                        cpu_count=cpu_count,
-                        memory_mb=memory_mb
-                    ))
+                        # Machine type info
+                        mt_name = short_name(inst.machine_type)
                     
-            return instances
+                        instance = GCEInstance(
+                            name=inst.name,
+                            project_id=project_id,
+                            zone=zone_name,
+                            machine_type=mt_name,
+                            status=intern(inst.status),
+                            internal_ip=internal_ip,
+                            external_ip=external_ip,
+                            network=network_url,
+                            subnet=subnet_url,
+                            # Proto maps / repeated fields are passed as-is; pydantic copies them into dict / list
+                            tags=inst.tags.items,
+                            labels=inst.labels,
+                            service_accounts=[sa.email for sa in inst.service_accounts],
+                            creation_timestamp=datetime.fromisoformat(inst.creation_timestamp) if inst.creation_timestamp else None
+                        )
+                        add_instance(instance)
+                        add_machine_type((instance, (zone_name, mt_name)))
+                    except Exception as inst_e:
+                        logger.warning(f"Skipping instance {inst.name} in {project_id}: {inst_e}")
             
         except Exception as e:
-            logger.error(f"Error scanning GCE instances in {project_id}: {e}")
-            return []
+            logger.error(f"Error scanning GCE instances in {project_id}, keeping {len(instances)} listed so far: {e}")
+        
+        machine_types = self._get_machine_types(project_id, {key for _, key in instance_machine_types})
+        for instance, key in instance_machine_types:
+            if key in machine_types:
+                instance.cpu_count, instance.memory_mb = machine_types[key]
+        
+        return instances
+
+    def _get_machine_types(self, project_id: str, keys: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """Fetch (cpu_count, memory_mb) for each distinct (zone, machine_type_name) concurrently."""
+        machine_types = {}
+        if not keys:
+            return machine_types
+        
+        with self._fanout(min(self.max_workers, len(keys))) as executor:
+            future_to_key = {
+                executor.submit(self.machine_types_client.get, project=project_id, zone=zone_name, machine_type=mt_name): (zone_name, mt_name)
+                for zone_name, mt_name in keys
+            }
+            for future in as_completed(future_to_key):
+                zone_name, mt_name = future_to_key[future]
+                try:
+                    mt_info = future.result()
+                    machine_types[(zone_name, mt_name)] = (mt_info.guest_cpus, mt_info.memory_mb)
+                except Exception as mt_e:
+                    logger.warning(f"Could not fetch machine type {mt_name} in {zone_name}: {mt_e}")
+        
+        return machine_types
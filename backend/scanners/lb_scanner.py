@@ -1,13 +1,15 @@
 
 import logging
 from typing import List, Optional, Dict
+from concurrent.futures import as_completed
+from google.api_core import exceptions as gcp_exceptions
 from google.cloud import compute_v1
 
 from models import (
     LoadBalancerDetails, LBFrontend, LBRoutingRule, LBBackend, BackendService,
     CertificateInfo, Project
 )
-from .base import BaseScanner
+from .base import BaseScanner, field_mask, short_name
 
 logger = logging.getLogger(__name__)
 
@@ -26,86 +28,78 @@ class LBScanner(BaseScanner):
             self.backend_services = {} # Name -> Object
             self.backend_buckets = {} # Name -> Object
             self.ssl_certificates = {}
+            # (context attribute, name) -> object fetched after a prefetch miss, so LBs sharing it fetch once.
+            # Kept apart from the prefetched maps, which collect_backend_services treats as the full listing.
+            self.fetched = {}
+
+    # Context attribute -> (client class, aggregated list field or None for global-only list)
+    PREFETCH_SOURCES = {
+        'target_http_proxies': (compute_v1.TargetHttpProxiesClient, 'target_http_proxies'),
+        'target_https_proxies': (compute_v1.TargetHttpsProxiesClient, 'target_https_proxies'),
+        'target_tcp_proxies': (compute_v1.TargetTcpProxiesClient, 'target_tcp_proxies'),
+        'target_ssl_proxies': (compute_v1.TargetSslProxiesClient, None),  # SslProxies usually only Global
+        'url_maps': (compute_v1.UrlMapsClient, 'url_maps'),
+        'ssl_certificates': (compute_v1.SslCertificatesClient, 'ssl_certificates'),
+        'backend_services': (compute_v1.BackendServicesClient, 'backend_services'),
+        'backend_buckets': (compute_v1.BackendBucketsClient, None),  # Global only usually
+    }
+
+    # Partial-response masks for the largest prefetch listings, limited to the fields
+    # resolve_lb_details / collect_backend_services read
+    PREFETCH_MASKS = {
+        'url_maps': field_mask("items/*/urlMaps(name,defaultService,hostRules,pathMatchers)"),
+        'backend_services': field_mask(
+            "items/*/backendServices("
+            "name,selfLink,description,protocol,sessionAffinity,loadBalancingScheme,healthChecks,"
+            "securityPolicy,edgeSecurityPolicy,cdnPolicy/cacheMode,backends(group,description,capacityScaler))"
+        ),
+    }
 
     def prefetch_resources(self, project_id: str) -> 'ProjectLBContext':
-        """Fetch all relevant global resources once."""
+        """Fetch all relevant global resources once, issuing the listings concurrently."""
         context = self.ProjectLBContext()
         try:
-            # 1. Proxies
-            try:
-                # HTTP - Global & Regional
-                client = compute_v1.TargetHttpProxiesClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.target_http_proxies:
-                        for item in list_obj.target_http_proxies:
-                            context.target_http_proxies[item.name] = item
-            except Exception: pass
-            
-            try:
-                # HTTPS - Global & Regional
-                client = compute_v1.TargetHttpsProxiesClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.target_https_proxies:
-                        for item in list_obj.target_https_proxies:
-                            context.target_https_proxies[item.name] = item
-            except Exception: pass
-
-            try:
-                # TCP - Global & Regional
-                client = compute_v1.TargetTcpProxiesClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.target_tcp_proxies:
-                        for item in list_obj.target_tcp_proxies:
-                            context.target_tcp_proxies[item.name] = item
-            except Exception: pass
-
-            try:
-                # SSL - Global & Regional
-                client = compute_v1.TargetSslProxiesClient(credentials=self.credentials)
-                 # SslProxies usually only Global, check aggregated
-                for r in client.list(project=project_id):
-                    context.target_ssl_proxies[r.name] = r
-            except Exception: pass
-
-            # 2. URL Maps - Global & Regional
-            try:
-                client = compute_v1.UrlMapsClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.url_maps:
-                         for item in list_obj.url_maps:
-                             context.url_maps[item.name] = item
-            except Exception: pass
-
-            # 3. Certificates - Global & Regional
-            try:
-                client = compute_v1.SslCertificatesClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.ssl_certificates:
-                        for item in list_obj.ssl_certificates:
-                            context.ssl_certificates[item.name] = item
-            except Exception: pass
-
-            # 4. Backend Services (Aggregated includes Global & Regional)
-            try:
-                client = compute_v1.BackendServicesClient(credentials=self.credentials)
-                for r, list_obj in client.aggregated_list(project=project_id):
-                    if list_obj.backend_services:
-                         for bs in list_obj.backend_services:
-                             context.backend_services[bs.name] = bs
-            except Exception: pass
-            
-            # 5. Backend Buckets (Global only usually)
-            try:
-                client = compute_v1.BackendBucketsClient(credentials=self.credentials)
-                for bb in client.list(project=project_id):
-                    context.backend_buckets[bb.name] = bb
-            except Exception: pass
+            with self._fanout(len(self.PREFETCH_SOURCES)) as executor:
+                future_to_attr = {
+                    executor.submit(self._fetch_by_name, project_id, client_cls, field, self.PREFETCH_MASKS.get(attr, ())): attr
+                    for attr, (client_cls, field) in self.PREFETCH_SOURCES.items()
+                }
+                for future in as_completed(future_to_attr):
+                    setattr(context, future_to_attr[future], future.result())
 
         except Exception as e:
             logger.warning(f"Error prefetching resources for {project_id}: {e}")
         
         return context
 
+    def _fetch_by_name(self, project_id: str, client_cls, field: Optional[str], metadata: tuple = ()) -> Dict[str, object]:
+        """List one resource type (Global & Regional when aggregated) keyed by name, optionally field-masked (see field_mask)."""
+        items = {}
+        try:
+            client = self._client(client_cls)
+            if field:
+                for r, list_obj in client.aggregated_list(project=project_id, metadata=metadata):
+                    for item in getattr(list_obj, field):
+                        items[item.name] = item
+            else:
+                for item in client.list(project=project_id, metadata=metadata):
+                    items[item.name] = item
+        except Exception: pass
+        return items
+
+    def _lookup(self, context: Optional['ProjectLBContext'], attr: str, name: str, fetch):
+        """Prefetched or previously fetched object for name, else fetch() memoized into the context."""
+        if context is None:
+            return fetch()
+        item = getattr(context, attr).get(name)
+        if item is None:
+            item = context.fetched.get((attr, name))
+        if item is None:
+            item = fetch()
+            if item is not None:
+                context.fetched[(attr, name)] = item
+        return item
+
     def resolve_lb_details(self, forwarding_rule, project_id: str, context: Optional['ProjectLBContext'] = None) -> LoadBalancerDetails:
         """
         Deeply resolve Load Balancer details (Frontend, Routing, Backends).
@@ -113,6 +107,8 @@ class LBScanner(BaseScanner):
         """
         
         details = LoadBalancerDetails()
+        # Backend short name -> full URL, which tells backend services and backend buckets apart
+        backend_links = {}
         
         try:
             # 1. Frontend Details
@@ -133,7 +129,7 @@ class LBScanner(BaseScanner):
             
             # Identify Proxy Type and Client
             target = forwarding_rule.target
-            proxy_name = target.split("/")[-1] if target else "None"
+            proxy_name = short_name(target) if target else "None"
             proxy_type = "Unknown"
             url_map_link = None
             cert_link = None
@@ -143,21 +139,15 @@ class LBScanner(BaseScanner):
 
             if "targetHttpProxies" in target:
                 proxy_type = "HTTP"
-                if context and proxy_name in context.target_http_proxies:
-                    proxy = context.target_http_proxies[proxy_name]
-                else:
-                    client = compute_v1.TargetHttpProxiesClient(credentials=self.credentials)
-                    proxy = client.get(project=project_id, target_http_proxy=proxy_name)
+                proxy = self._lookup(context, 'target_http_proxies', proxy_name, lambda: self._client(compute_v1.TargetHttpProxiesClient).get(
+                    project=project_id, target_http_proxy=proxy_name))
                 
                 if proxy: url_map_link = proxy.url_map
 
             elif "targetHttpsProxies" in target:
                 proxy_type = "HTTPS"
-                if context and proxy_name in context.target_https_proxies:
-                    proxy = context.target_https_proxies[proxy_name]
-                else:
-                    client = compute_v1.TargetHttpsProxiesClient(credentials=self.credentials)
-                    proxy = client.get(project=project_id, target_https_proxy=proxy_name)
+                proxy = self._lookup(context, 'target_https_proxies', proxy_name, lambda: self._client(compute_v1.TargetHttpsProxiesClient).get(
+                    project=project_id, target_https_proxy=proxy_name))
                 
                 if proxy:
                     url_map_link = proxy.url_map
@@ -168,19 +158,13 @@ class LBScanner(BaseScanner):
 
             elif "targetTcpProxies" in target:
                 proxy_type = "TCP"
-                if context and proxy_name in context.target_tcp_proxies:
-                    proxy = context.target_tcp_proxies[proxy_name]
-                else:
-                    client = compute_v1.TargetTcpProxiesClient(credentials=self.credentials)
-                    proxy = client.get(project=project_id, target_tcp_proxy=proxy_name)
+                proxy = self._lookup(context, 'target_tcp_proxies', proxy_name, lambda: self._client(compute_v1.TargetTcpProxiesClient).get(
+                    project=project_id, target_tcp_proxy=proxy_name))
 
             elif "targetSslProxies" in target:
                 proxy_type = "SSL"
-                if context and proxy_name in context.target_ssl_proxies:
-                    proxy = context.target_ssl_proxies[proxy_name]
-                else:
-                    client = compute_v1.TargetSslProxiesClient(credentials=self.credentials)
-                    proxy = client.get(project=project_id, target_ssl_proxy=proxy_name)
+                proxy = self._lookup(context, 'target_ssl_proxies', proxy_name, lambda: self._client(compute_v1.TargetSslProxiesClient).get(
+                    project=project_id, target_ssl_proxy=proxy_name))
                 
                 if proxy and proxy.ssl_certificates:
                      cert_link = proxy.ssl_certificates[0]
@@ -191,7 +175,8 @@ class LBScanner(BaseScanner):
                 
                 # Internal TCP/UDP LB (Passthrough) uses backend_service directly
                 if forwarding_rule.backend_service:
-                    bs_name = forwarding_rule.backend_service.split("/")[-1]
+                    bs_name = short_name(forwarding_rule.backend_service)
+                    backend_links.setdefault(bs_name, forwarding_rule.backend_service)
                     details.routing_rules.append(LBRoutingRule(
                         hosts=["*"],
                         path="/* (Default)",
@@ -200,133 +185,159 @@ class LBScanner(BaseScanner):
 
             # Helper for constructing Cert details
             cert_details = []
-            if proxy and (hasattr(proxy, 'ssl_certificates') and proxy.ssl_certificates):
+            # Only HTTPS / SSL proxies carry certificates, and cert_link is set exactly when they have any
+            if cert_link:
                  self._resolve_certs(project_id, proxy.ssl_certificates, cert_details, context)
 
             details.frontend = LBFrontend(
                 protocol=proxy_type,
                 ip_port=ip_port,
-                certificate=cert_link.split("/")[-1] if cert_link else None,
-                ssl_policy=ssl_policy_link.split("/")[-1] if ssl_policy_link else None,
+                certificate=short_name(cert_link) if cert_link else None,
+                ssl_policy=short_name(ssl_policy_link) if ssl_policy_link else None,
                 certificate_details=cert_details
             )
 
             # 2. Routing Rules (from URL Map)
             if url_map_link:
-                url_map_name = url_map_link.split("/")[-1]
+                url_map_name = short_name(url_map_link)
                 details.url_map = url_map_name
                 
-                url_map = None
-                if context and url_map_name in context.url_maps:
-                    url_map = context.url_maps[url_map_name]
-                else:
-                    url_maps_client = compute_v1.UrlMapsClient(credentials=self.credentials)
-                    url_map = url_maps_client.get(project=project_id, url_map=url_map_name)
+                url_map = self._lookup(context, 'url_maps', url_map_name, lambda: self._client(compute_v1.UrlMapsClient).get(
+                    project=project_id, url_map=url_map_name))
 
                 if url_map:
                     # Default Service
                     if url_map.default_service:
+                        backend_links.setdefault(short_name(url_map.default_service), url_map.default_service)
                         details.routing_rules.append(LBRoutingRule(
                             hosts=["*"],
                             path="/* (Default)",
-                            backend_service=url_map.default_service.split("/")[-1]
+                            backend_service=short_name(url_map.default_service)
                         ))
                     
                     # Host Rules
                     if url_map.host_rules:
+                        # Index path matchers once instead of scanning them for every host rule
+                        pm_by_name = {pm.name: pm for pm in url_map.path_matchers}
                         for host_rule in url_map.host_rules:
-                            path_matcher_name = host_rule.path_matcher
                             # Find corresponding path matcher
-                            for pm in url_map.path_matchers:
-                                if pm.name == path_matcher_name:
-                                    # Default for this host
-                                    if pm.default_service:
-                                         details.routing_rules.append(LBRoutingRule(
-                                            hosts=list(host_rule.hosts),
-                                            path="/* (Default)",
-                                            backend_service=pm.default_service.split("/")[-1]
-                                        ))
-                                    # Path rules
-                                    for path_rule in pm.path_rules:
-                                        details.routing_rules.append(LBRoutingRule(
-                                            hosts=list(host_rule.hosts),
-                                            path=", ".join(path_rule.paths),
-                                            backend_service=path_rule.service.split("/")[-1]
-                                        ))
+                            pm = pm_by_name.get(host_rule.path_matcher)
+                            if pm is None:
+                                continue
+                            # Default for this host
+                            if pm.default_service:
+                                 backend_links.setdefault(short_name(pm.default_service), pm.default_service)
+                                 details.routing_rules.append(LBRoutingRule(
+                                    hosts=list(host_rule.hosts),
+                                    path="/* (Default)",
+                                    backend_service=short_name(pm.default_service)
+                                ))
+                            # Path rules
+                            for path_rule in pm.path_rules:
+                                backend_links.setdefault(short_name(path_rule.service), path_rule.service)
+                                details.routing_rules.append(LBRoutingRule(
+                                    hosts=list(host_rule.hosts),
+                                    path=", ".join(path_rule.paths),
+                                    backend_service=short_name(path_rule.service)
+                                ))
 
             # 3. Backend Services Details
             backend_service_names = list(set([r.backend_service for r in details.routing_rules]))
             
-            bs_client = compute_v1.BackendServicesClient(credentials=self.credentials)
-            bb_client = compute_v1.BackendBucketsClient(credentials=self.credentials)
-
+            # Context hits are resolved inline; the remaining lookups are independent RPCs, run concurrently
+            backends = {}
+            missing = []
             for bs_name in backend_service_names:
-                # Try context first
-                bs = None
-                if context and bs_name in context.backend_services:
-                    bs = context.backend_services[bs_name]
-                
-                if bs:
-                     self._append_backend_details(details, bs)
+                if "/backendBuckets/" in backend_links.get(bs_name, ""):
+                    bb = (context.backend_buckets.get(bs_name) or context.fetched.get(('backend_buckets', bs_name))) if context else None
+                    if bb is not None:
+                        backends[bs_name] = self._bucket_backend(bs_name, bb)
+                    else:
+                        missing.append(bs_name)
+                    continue
+                bs = (context.backend_services.get(bs_name) or context.fetched.get(('backend_services', bs_name))) if context else None
+                if bs is not None:
+                    backends[bs_name] = self._service_backend(bs)
                 else:
-                    try:
-                        # Backend Service (fetch)
-                        bs = bs_client.get(project=project_id, backend_service=bs_name)
-                        self._append_backend_details(details, bs)
-                    except:
-                        # Backend Bucket
-                        try:
-                            bb = None
-                            if context and bs_name in context.backend_buckets:
-                                bb = context.backend_buckets[bs_name]
-                            else:
-                                bb = bb_client.get(project=project_id, backend_bucket=bs_name)
-                            
-                            details.backends.append(LBBackend(
-                                name=bs_name,
-                                type="Bucket",
-                                description=bb.description,
-                                cdn_enabled=bb.cdn_policy.cache_mode is not None if bb.cdn_policy else False
-                            ))
-                        except Exception as e:
-                            logger.warning(f"Could not fetch details for backend {bs_name}: {e}")
+                    missing.append(bs_name)
+            
+            if len(missing) == 1:
+                backends[missing[0]] = self._fetch_backend(project_id, missing[0], context, backend_links.get(missing[0]))
+            elif missing:
+                with self._fanout(min(self.max_workers, len(missing))) as executor:
+                    fetch = lambda n: self._fetch_backend(project_id, n, context, backend_links.get(n))
+                    for bs_name, backend in zip(missing, executor.map(fetch, missing)):
+                        backends[bs_name] = backend
+            
+            for bs_name in backend_service_names:
+                if backends.get(bs_name):
+                    details.backends.append(backends[bs_name])
 
         except Exception as e:
             logger.warning(f"Error resolving deep details for LB {forwarding_rule.name}: {e}")
         
         return details
 
-    def _append_backend_details(self, details, bs):
-        """Helper to append backend service details."""
-        details.backends.append(LBBackend(
+    def _service_backend(self, bs) -> LBBackend:
+        """Build backend details from a backend service."""
+        return LBBackend(
             name=bs.name,
             type="Instance Group" if bs.backends else "Network Endpoint Group",
             description=bs.description,
             cdn_enabled=bs.cdn_policy.cache_mode is not None if bs.cdn_policy else False,
-            security_policy=bs.security_policy.split("/")[-1] if bs.security_policy else (bs.edge_security_policy.split("/")[-1] if bs.edge_security_policy else None)
-        ))
+            security_policy=short_name(bs.security_policy) if bs.security_policy else (short_name(bs.edge_security_policy) if bs.edge_security_policy else None)
+        )
+
+    def _bucket_backend(self, name: str, bb) -> LBBackend:
+        """Build backend details from a backend bucket."""
+        return LBBackend(
+            name=name,
+            type="Bucket",
+            description=bb.description,
+            cdn_enabled=bb.cdn_policy.cache_mode is not None if bb.cdn_policy else False
+        )
+
+    def _fetch_backend(self, project_id: str, bs_name: str, context: Optional['ProjectLBContext'], link: Optional[str] = None) -> Optional[LBBackend]:
+        """
+        Fetch a backend that is not in the context. The URL decides service vs bucket when it names one;
+        otherwise a backend service is tried first, falling back to a bucket only when it does not exist.
+        """
+        link = link or ""
+        if "/backendBuckets/" not in link:
+            try:
+                # Backend Service (fetch)
+                bs = self._lookup(context, 'backend_services', bs_name, lambda: self._client(compute_v1.BackendServicesClient).get(
+                    project=project_id, backend_service=bs_name))
+                return self._service_backend(bs)
+            except gcp_exceptions.NotFound:
+                if "/backendServices/" in link:
+                    logger.warning(f"Backend service {bs_name} not found in {project_id}")
+                    return None
+            except Exception as e:
+                # Transient errors are not retried as a bucket lookup
+                logger.warning(f"Could not fetch details for backend {bs_name}: {e}")
+                return None
+
+        # Backend Bucket
+        try:
+            bb = self._lookup(context, 'backend_buckets', bs_name, lambda: self._client(compute_v1.BackendBucketsClient).get(
+                project=project_id, backend_bucket=bs_name))
+            return self._bucket_backend(bs_name, bb)
+        except Exception as e:
+            logger.warning(f"Could not fetch details for backend {bs_name}: {e}")
+        return None
 
     def _resolve_certs(self, project_id: str, cert_urls: List[str], target_list: List[CertificateInfo], context: Optional['ProjectLBContext']):
         """Helper to resolve SSL cert details using context or fetch."""
         
-        cert_client = None
-        
+        def fetch_cert(cert_name):
+            try:
+                return self._client(compute_v1.SslCertificatesClient).get(project=project_id, ssl_certificate=cert_name)
+            except: return None
+
         for cert_url in cert_urls:
-            cert_name = cert_url.split("/")[-1]
-            cert = None
-            
-            if context and cert_name in context.ssl_certificates:
-                cert = context.ssl_certificates[cert_name]
-            else:
-                 if not cert_client:
-                      try: 
-                          cert_client = compute_v1.SslCertificatesClient(credentials=self.credentials)
-                      except: pass
-                 
-                 if cert_client:
-                     try:
-                        cert = cert_client.get(project=project_id, ssl_certificate=cert_name)
-                     except: pass
+            cert_name = short_name(cert_url)
+            cert = self._lookup(context, 'ssl_certificates', cert_name, lambda: fetch_cert(cert_name))
             
             if cert:
                 target_list.append(CertificateInfo(
@@ -348,12 +359,8 @@ class LBScanner(BaseScanner):
             try:
                 for bs in context.backend_services.values():
                      # Determine region from self_link if possible, or assume global if not
-                    region = "global"
-                    if "regions/" in bs.self_link:
-                         # .../regions/REGION_NAME/backendServices/...
-                         try:
-                             region = bs.self_link.split("regions/")[1].split("/")[0]
-                         except: pass
+                    # .../regions/REGION_NAME/backendServices/...
+                    region = bs.self_link.partition("/regions/")[2].partition("/")[0] or "global"
 
                     self._process_backend_service(bs, project_id, region, service_to_ips, services)
             except Exception as e:
@@ -362,13 +369,13 @@ class LBScanner(BaseScanner):
             # Fallback to API calls
             try:
                 # 1. Global
-                bs_client = compute_v1.BackendServicesClient(credentials=self.credentials)
+                bs_client = self._client(compute_v1.BackendServicesClient)
                 for bs in bs_client.list(project=project_id):
                     self._process_backend_service(bs, project_id, "global", service_to_ips, services)
 
                 # 2. Regional
-                regions_client = compute_v1.RegionsClient(credentials=self.credentials)
-                region_bs_client = compute_v1.RegionBackendServicesClient(credentials=self.credentials)
+                regions_client = self._client(compute_v1.RegionsClient)
+                region_bs_client = self._client(compute_v1.RegionBackendServicesClient)
                 
                 for region_obj in regions_client.list(project=project_id):
                     region_name = region_obj.name
@@ -384,8 +391,6 @@ class LBScanner(BaseScanner):
         return services
 
     def _process_backend_service(self, bs, project_id, region, service_to_ips, services_list):
-        from models import LBBackend as ModelLBBackend
-        
         # Look up associated IPs
         key = f"{project_id}|{region}|{bs.name}"
         associated_ips = service_to_ips.get(key, [])
@@ -394,12 +399,12 @@ class LBScanner(BaseScanner):
         backends_list = []
         if bs.backends:
             for backend in bs.backends:
-                backends_list.append(ModelLBBackend(
-                    name=backend.group.split("/")[-1] if backend.group else "Unknown",
+                backends_list.append(LBBackend(
+                    name=short_name(backend.group) if backend.group else "Unknown",
                     type="Instance Group" if "instanceGroups" in (backend.group or "") else "NEG",
                     description=backend.description,
                     capacity_scaler=backend.capacity_scaler,
-                    security_policy=bs.security_policy.split("/")[-1] if bs.security_policy else (bs.edge_security_policy.split("/")[-1] if bs.edge_security_policy else None)
+                    security_policy=short_name(bs.security_policy) if bs.security_policy else (short_name(bs.edge_security_policy) if bs.edge_security_policy else None)
                 ))
                 
         services_list.append(BackendService(
@@ -412,6 +417,6 @@ class LBScanner(BaseScanner):
             load_balancing_scheme=bs.load_balancing_scheme,
             description=bs.description,
             backends=backends_list,
-            health_checks=[hc.split("/")[-1] for hc in bs.health_checks] if bs.health_checks else [],
+            health_checks=[short_name(hc) for hc in bs.health_checks] if bs.health_checks else [],
             self_link=bs.self_link
         ))
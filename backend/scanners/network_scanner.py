@@ -1,6 +1,6 @@
 
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from google.cloud import compute_v1
 from google.api_core import exceptions as gcp_exceptions
 
@@ -15,12 +15,16 @@ class NetworkScanner(BaseScanner):
     def scan_vpc_networks(self, project_id: str, include_shared_vpc: bool) -> List[VPCNetwork]:
         """List all VPC networks in a project."""
         vpcs = []
-        networks_client = compute_v1.NetworksClient(credentials=self.credentials)
+        networks_client = self._client(compute_v1.NetworksClient)
         
         try:
             request = compute_v1.ListNetworksRequest(project=project_id)
+            # One aggregated subnet listing serves every network, fetched on the first network
+            subnets_by_network = None
             
             for network in networks_client.list(request=request):
+                if subnets_by_network is None:
+                    subnets_by_network = self.scan_all_subnets(project_id)
                 vpc = VPCNetwork(
                     name=network.name,
                     self_link=network.self_link,
@@ -39,23 +43,11 @@ class NetworkScanner(BaseScanner):
                     ]
                 )
                 
-                # Check if this network is a Shared VPC host network
-                if include_shared_vpc:
-                    try:
-                        xpn_client = compute_v1.ProjectsClient(credentials=self.credentials)
-                        xpn_resources_request = compute_v1.ListXpnHostsProjectsRequest(
-                            project=project_id
-                        )
-                        # If we can list XPN hosts, this project might be a host
-                        # This logic is a bit implicit, refining it:
-                        # Usually the project itself is marked as host.
-                        # If project is host, its networks *can* be shared.
-                        pass # Kept consistent with original logic for now
-                    except:
-                        pass
+                # Shared VPC host status is per project (ProjectScanner.get_shared_vpc_info),
+                # so nothing is probed per network here
                 
                 # Get subnets for this network
-                vpc.subnets = self.scan_subnets(project_id, network.self_link)
+                vpc.subnets = subnets_by_network.get(network.self_link, [])
                 vpcs.append(vpc)
                 
         except gcp_exceptions.PermissionDenied:
@@ -67,29 +59,33 @@ class NetworkScanner(BaseScanner):
     
     def scan_subnets(self, project_id: str, network_self_link: str) -> List[Subnet]:
         """List all subnets in a VPC network."""
-        subnets = []
-        subnetworks_client = compute_v1.SubnetworksClient(credentials=self.credentials)
+        return self.scan_all_subnets(project_id).get(network_self_link, [])
+    
+    def scan_all_subnets(self, project_id: str) -> Dict[str, List[Subnet]]:
+        """List all subnets in a project with a single aggregated listing, grouped by network self link."""
+        subnets = {}
+        subnetworks_client = self._client(compute_v1.SubnetworksClient)
         
         try:
             request = compute_v1.AggregatedListSubnetworksRequest(project=project_id)
             
+            group = subnets.setdefault
             # aggregated_list returns (region, subnets_scoped_list)
             for region, subnets_scoped_list in subnetworks_client.aggregated_list(request=request):
                 if subnets_scoped_list.subnetworks:
+                    # Scope key is 'regions/REGION'; parse it once per scope, not per subnet
+                    region_name = region.rpartition("/")[2]
                     for subnetwork in subnets_scoped_list.subnetworks:
-                        # Only include subnets belonging to this network
-                        if subnetwork.network != network_self_link:
-                            continue
-                        
+                        network = subnetwork.network
                         subnet = Subnet(
                             name=subnetwork.name,
-                            region=region.replace("regions/", ""),
+                            region=region_name,
                             ip_cidr_range=subnetwork.ip_cidr_range,
                             gateway_ip=subnetwork.gateway_address,
                             private_ip_google_access=subnetwork.private_ip_google_access or False,
-                            purpose=subnetwork.purpose if hasattr(subnetwork, 'purpose') else None,
+                            purpose=subnetwork.purpose or None,
                             self_link=subnetwork.self_link,
-                            network=subnetwork.network,
+                            network=network,
                             secondary_ip_ranges=[
                                 {
                                     "range_name": r.range_name,
@@ -98,7 +94,7 @@ class NetworkScanner(BaseScanner):
                                 for r in (subnetwork.secondary_ip_ranges or [])
                             ]
                         )
-                        subnets.append(subnet)
+                        group(network, []).append(subnet)
                         
         except gcp_exceptions.PermissionDenied:
             logger.warning(f"Permission denied listing subnets in {project_id}")
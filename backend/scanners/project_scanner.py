@@ -1,10 +1,15 @@
 
 import logging
-from typing import List, Optional
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 from google.cloud import resourcemanager_v3, compute_v1
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import wait, FIRST_COMPLETED
 from google.api_core import exceptions as gcp_exceptions
 
+from credentials_manager import credentials_manager
 from models import Project, VPCNetwork
 from .base import BaseScanner
 
@@ -12,68 +17,208 @@ logger = logging.getLogger(__name__)
 
 class ProjectScanner(BaseScanner):
     """Scanner for discovering projects and their basic metadata."""
+
+    # Hierarchy listings are shared across scanner instances (a new GCPScanner is built per scan),
+    # keyed by (active credential path, scope) and reused for LISTING_TTL_SECONDS.
+    LISTING_TTL_SECONDS = 60
+    _listing_cache: Dict[Tuple[Optional[str], str], Tuple[float, List[str]]] = {}
+    _listing_lock = threading.Lock()
+
+    # PROJECT_DISCOVERY_MODE=search enumerates the folder tree first and then finds projects with
+    # batched SearchProjects parent queries; the default "walk" lists projects folder by folder.
+    DISCOVERY_MODE = os.getenv("PROJECT_DISCOVERY_MODE", "walk").lower()
+    SEARCH_PARENTS_PER_QUERY = 50
     
-    def __init__(self, max_workers: int = 10, credentials=None):
-        super().__init__(max_workers, credentials)
+    def __init__(self, max_workers: int = 10, credentials=None, executor=None):
+        super().__init__(max_workers, credentials, executor)
         self.folders_client = resourcemanager_v3.FoldersClient(credentials=self.credentials)
         
     def list_projects_in_folder(self, folder_id: str) -> List[str]:
         """Recursively list all active project IDs in a folder."""
+        root = f"folders/{folder_id}"
+        return self._cached_listing(root, lambda: self._discover_projects(root))
+
+    def list_projects_in_organization(self, org_id: str) -> List[str]:
+        """Recursively list all active project IDs in an organization."""
+        root = f"organizations/{org_id}"
+        return self._cached_listing(root, lambda: self._discover_projects(root))
+
+    def _cached_listing(self, scope: str, loader: Callable[[], Tuple[List[str], bool]]) -> List[str]:
+        """
+        Return a recent listing for `scope` from the shared cache, or run `loader` and store it.
+        `loader` returns (project_ids, complete); listings that hit an error are returned but not cached.
+        """
+        key = (credentials_manager.get_active_credential_path(), scope)
+        with self._listing_lock:
+            hit = self._listing_cache.get(key)
+            if hit and time.monotonic() - hit[0] < self.LISTING_TTL_SECONDS:
+                return list(hit[1])
+
+        project_ids, complete = loader()
+        # A partial listing would hide the missing projects for the whole TTL
+        if complete:
+            with self._listing_lock:
+                self._listing_cache[key] = (time.monotonic(), project_ids)
+        return list(project_ids)
+
+    def _discover_projects(self, root: str) -> Tuple[List[str], bool]:
+        """List projects under `root` using the configured discovery mode."""
+        if self.DISCOVERY_MODE == "search":
+            return self._search_hierarchy(root)
+        return self._walk_hierarchy(root)
+
+    def _walk_hierarchy(self, root: str) -> Tuple[List[str], bool]:
+        """
+        Breadth-first walk of a resource hierarchy starting at `root`.
+        Every discovered folder gets two tasks (list projects / list sub-folders) on the pool,
+        so sibling folders are listed in parallel instead of one recursion level at a time.
+        Results are merged on the calling thread, so no shared state needs locking.
+        """
+        project_ids = set()
+        complete = True
+        with self._fanout(self.max_workers) as executor:
+            pending = {
+                executor.submit(self._list_child_projects, root): "projects",
+                executor.submit(self._list_child_folders, root): "folders",
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind = pending.pop(future)
+                    items, ok = future.result()
+                    complete = complete and ok
+                    if kind == "projects":
+                        project_ids.update(items)
+                        continue
+                    for folder in items:
+                        pending[executor.submit(self._list_child_projects, folder)] = "projects"
+                        pending[executor.submit(self._list_child_folders, folder)] = "folders"
+        
+        return list(project_ids), complete
+
+    def _search_hierarchy(self, root: str) -> Tuple[List[str], bool]:
+        """
+        Enumerate every folder under `root`, then find their projects with SearchProjects,
+        OR-ing SEARCH_PARENTS_PER_QUERY parents into each query instead of one ListProjects per folder.
+        """
+        folders, complete = self._collect_folders(root)
+        parents = [root] + folders
+        batches = [
+            parents[i:i + self.SEARCH_PARENTS_PER_QUERY]
+            for i in range(0, len(parents), self.SEARCH_PARENTS_PER_QUERY)
+        ]
+        
+        project_ids = set()
+        with self._fanout(min(self.max_workers, len(batches))) as executor:
+            for result, ok in executor.map(self._search_projects_by_parents, batches):
+                project_ids.update(result)
+                complete = complete and ok
+        
+        return list(project_ids), complete
+
+    def _collect_folders(self, root: str) -> Tuple[List[str], bool]:
+        """Breadth-first listing of all folder resource names below `root` (excluding `root`)."""
+        folders = []
+        complete = True
+        with self._fanout(self.max_workers) as executor:
+            pending = {executor.submit(self._list_child_folders, root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    children, ok = future.result()
+                    complete = complete and ok
+                    for folder in children:
+                        folders.append(folder)
+                        pending.add(executor.submit(self._list_child_folders, folder))
+        
+        return folders, complete
+
+    def _search_projects_by_parents(self, parents: List[str]) -> Tuple[List[str], bool]:
+        """
+        Active project IDs whose direct parent is one of `parents`, via a single SearchProjects query,
+        and whether the query succeeded.
+        """
         project_ids = []
         try:
-            # 1. List projects in this folder
-            req = resourcemanager_v3.ListProjectsRequest(parent=f"folders/{folder_id}")
-            for project in self.projects_client.list_projects(request=req):
+            query = " OR ".join(f"parent:{parent}" for parent in parents)
+            req = resourcemanager_v3.SearchProjectsRequest(query=query)
+            for project in self.projects_client.search_projects(request=req):
                 if project.state == resourcemanager_v3.Project.State.ACTIVE:
-                    # Parse project ID from name "projects/123..." or get project_id field
-                    # The object has .project_id (string id) and .name (numeric id path)
                     project_ids.append(project.project_id)
-
-            # 2. List sub-folders
-            req_folders = resourcemanager_v3.ListFoldersRequest(parent=f"folders/{folder_id}")
-            for folder in self.folders_client.list_folders(request=req_folders):
-                # Recursively scan sub-folder
-                folder_id_numeric = folder.name.split("/")[-1]
-                project_ids.extend(self.list_projects_in_folder(folder_id_numeric))
-                
         except Exception as e:
-            logger.error(f"Error scanning folder {folder_id}: {e}")
-            
-        return project_ids
+            logger.error(f"Error searching projects under {len(parents)} parents: {e}")
+            return project_ids, False
+        return project_ids, True
 
-    def list_projects_in_organization(self, org_id: str) -> List[str]:
-        """Recursively list all active project IDs in an organization."""
+    def _list_child_projects(self, parent: str) -> Tuple[List[str], bool]:
+        """List active project IDs directly under a folder or organization, and whether the listing succeeded."""
         project_ids = []
         try:
-            # 1. List projects directly under Org
-            req = resourcemanager_v3.ListProjectsRequest(parent=f"organizations/{org_id}")
+            req = resourcemanager_v3.ListProjectsRequest(parent=parent)
             for project in self.projects_client.list_projects(request=req):
                 if project.state == resourcemanager_v3.Project.State.ACTIVE:
+                    # The object has .project_id (string id) and .name (numeric id path)
                     project_ids.append(project.project_id)
-            
-            # 2. List folders under Org
-            req_folders = resourcemanager_v3.ListFoldersRequest(parent=f"organizations/{org_id}")
+        except Exception as e:
+            logger.error(f"Error listing projects in {parent}: {e}")
+            return project_ids, False
+        return project_ids, True
+
+    def _list_child_folders(self, parent: str) -> Tuple[List[str], bool]:
+        """
+        List sub-folder resource names ("folders/123") directly under a folder or organization,
+        and whether the listing succeeded.
+        """
+        folders = []
+        try:
+            req_folders = resourcemanager_v3.ListFoldersRequest(parent=parent)
             for folder in self.folders_client.list_folders(request=req_folders):
-                folder_id = folder.name.split("/")[-1]
-                project_ids.extend(self.list_projects_in_folder(folder_id))
-                
+                folders.append(folder.name)
         except Exception as e:
-             logger.error(f"Error scanning organization {org_id}: {e}")
-             
-        return project_ids
+            logger.error(f"Error listing folders in {parent}: {e}")
+            return folders, False
+        return folders, True
 
     def list_all_accessible_projects(self) -> List[str]:
         """List all active projects accessible to the credential."""
+        return self._cached_listing("all", self._search_active_projects)
+
+    def _search_active_projects(self) -> Tuple[List[str], bool]:
+        """
+        Search for every active project visible to the credential.
+        A background thread walks the pager while this thread consumes pages, so the
+        next page's round trip overlaps with processing the current one. The bounded
+        queue keeps the fetcher at most two pages ahead. A pager error ends the listing
+        early, so it is then reported as incomplete.
+        """
         project_ids = []
-        try:
-            # Query for all active projects
-            req = resourcemanager_v3.SearchProjectsRequest(query="state:ACTIVE")
-            for project in self.projects_client.search_projects(request=req):
-                project_ids.append(project.project_id)
-        except Exception as e:
-            logger.error(f"Error searching all projects: {e}")
+        complete = True
+        pages: "queue.Queue" = queue.Queue(maxsize=2)
+        done = object()
+
+        def fetch_pages():
+            try:
+                # Query for all active projects
+                req = resourcemanager_v3.SearchProjectsRequest(query="state:ACTIVE")
+                for page in self.projects_client.search_projects(request=req).pages:
+                    pages.put(page)
+            except Exception as e:
+                pages.put(e)
+            finally:
+                pages.put(done)
+
+        threading.Thread(target=fetch_pages, name="search-projects-pager", daemon=True).start()
+        while True:
+            page = pages.get()
+            if page is done:
+                break
+            if isinstance(page, Exception):
+                logger.error(f"Error searching all projects: {page}")
+                complete = False
+                continue
+            project_ids.extend(project.project_id for project in page.projects)
             
-        return project_ids
+        return project_ids, complete
 
     def get_project_details(self, project_id: str) -> Optional[dict]:
         """Get project display name and number."""
@@ -92,7 +237,7 @@ class ProjectScanner(BaseScanner):
         """Get Shared VPC information for a project."""
         result = {"is_host": False, "host_project": None}
         try:
-            xpn_client = compute_v1.ProjectsClient(credentials=self.credentials)
+            xpn_client = self._client(compute_v1.ProjectsClient)
             
             # Check host
             try:
@@ -8,6 +8,11 @@ logger = logging.getLogger(__name__)
 
 class StorageScanner(BaseScanner):
     """Scanner for Cloud Storage Buckets."""
+
+    def __init__(self, max_workers: int = 10, credentials=None, executor=None):
+        super().__init__(max_workers, credentials, executor)
+        # One client for every project; the project is passed per list_buckets call
+        self.storage_client = storage.Client(project=None, credentials=self.credentials)
     
     def scan_buckets(self, project_id: str) -> List[GCSBucket]:
         """Scans for all GCS buckets in a project."""
@@ -15,11 +20,7 @@ class StorageScanner(BaseScanner):
         buckets = []
         
         try:
-            # Note: storage.Client uses credentials from environment or provided
-            # We use the same credentials as other scanners
-            client = storage.Client(project=project_id, credentials=self.credentials)
-            
-            for bucket in client.list_buckets():
+            for bucket in self.storage_client.list_buckets(project=project_id):
                 # Check for public access
                 # This is a simplified check for demo purposes
                 is_public = False
@@ -38,7 +39,7 @@ class StorageScanner(BaseScanner):
                     location=bucket.location,
                     storage_class=bucket.storage_class,
                     creation_time=bucket.time_created,
-                    labels=dict(bucket.labels) if bucket.labels else {},
+                    labels=bucket.labels,  # already a fresh dict copy
                     is_public=is_public,
                     versioning_enabled=bucket.versioning_enabled
                 ))
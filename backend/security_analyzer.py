@@ -1,5 +1,5 @@
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List
 from uuid import uuid4
 
@@ -137,7 +137,6 @@ def _analyze_public_ips(public_ips: List[PublicIP]) -> List[SecurityIssue]:
 
 def _analyze_certificates(public_ips: List[PublicIP], internal_ips: List[UsedInternalIP]) -> List[SecurityIssue]:
     issues = []
-    from datetime import timezone
     now = datetime.now(timezone.utc)
     
     # Gather all certs to avoid duplicates? (Certs might be reused across LBs)